@@ -4,12 +4,13 @@ import pandas as pd
 import numpy as np
 from plotly import graph_objects as go
 from datetime import date, timedelta
-import json
-import re
-from pathlib import Path
 
-from src.data_load import get_local_csv_data
-from src.utils import set_base_session_sates, filter_data
+from src.data_load import get_dataset
+from src.ata_index import get_ata_index
+from src.utils import set_base_session_sates, filtered_rows, current_selections, paged_dataframe
+from src.filter_index import group_rows
+from src.task_stats import task_ratio_stats, execution_ids, get_task_day_stats
+from src.similarity_index import similar_findings
 
 # Captura de clics en Plotly (un plus)
 try:
@@ -21,88 +22,13 @@ except Exception:
 st.set_page_config(page_title="Top 10 Tasks by Findings Ratio", layout="wide")
 set_base_session_sates()
 
-# --------------- MAPEO DE ATAS ------------------------
-@st.cache_data
-def load_ata_map(json_path: str = "utils/ata.json") -> dict:
-    """
-    Carga utils/ata.json y construye un dict:
-        {"01": "Reserved for Airline Use", "05": "TIME LIMITS/MAINTENANCE CHECKS", ...}
-    Soporta tanto un JSON tipo {"ata_chapters": [...]} como una lista directa.
-    """
-    path = Path(json_path)
-    if not path.exists():
-        # fallback por si el proyecto lo tiene en otra carpeta
-        alt = Path("src/utils/ata.json")
-        if alt.exists():
-            path = alt
-        else:
-            st.warning(f"No se encontró {json_path} ni {alt}. No se podrá mapear ATA → nombre.")
-            return {}
-
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    items = data.get("ata_chapters", data)  # admite lista o dict con clave "ata_chapters"
-    ata_map = {}
-
-    for ch in items:
-        num = ch.get("chapter_number") or ch.get("chapter") or ch.get("code")
-        name = ch.get("chapter_name") or ch.get("name")
-        if not num or not name:
-            continue
-        num_str = str(num).strip()
-        # Normaliza claves de 2 y 3 dígitos para cubrir capítulos 01–99 y 100–115
-        if num_str.isdigit():
-            n = int(num_str)
-            # guarda tanto clave 2 dígitos como 3 si aplica
-            ata_map[str(n).zfill(2)] = name
-            if n >= 100:
-                ata_map[str(n).zfill(3)] = name
-        else:
-            # por si viniera con formato "05" o "05-" etc.
-            m = re.match(r"^(\d{2,3})", num_str)
-            if m:
-                k = m.group(1)
-                ata_map[k] = name
-                ata_map[k.zfill(2)] = name
-                ata_map[k.zfill(3)] = name
-
-    return ata_map
-
-
-def extract_ata_chapter_key(val: object, keys_available: set) -> str | None:
-    """
-    A partir de 'ata_chapter_code' (p.ej. 27, '27-50-00', '071', '115-20', '05-10'),
-    devuelve la clave con la que buscar en ata_map: prioriza 3 dígitos si existe,
-    si no 2 dígitos.
-    """
-    if val is None or (isinstance(val, float) and pd.isna(val)):
-        return None
-
-    s = str(val).strip()
-    # coge los primeros 3 o 2 dígitos iniciales
-    m = re.match(r"^\D*(\d{2,3})", s)
-    if not m:
-        return None
-    raw = m.group(1)
-
-    # Prueba 3 y 2 dígitos según disponibilidad del mapa
-    cands = []
-    if len(raw) >= 3:
-        cands.append(raw[:3].zfill(3))
-    cands.append(raw[:2].zfill(2))
-
-    for c in cands:
-        if c in keys_available:
-            return c
-    return None
-
-
 # -------------------- Carga de datos --------------------
-df = get_local_csv_data().copy()
+dataset = get_dataset()   # compartido y de sólo lectura
 
-# -------------------- CREO EL MAPA DE ATAS --------------------
-ata_map = load_ata_map()
+# -------------------- ÍNDICE DE ATAS (capítulo/sección/subject) --------------------
+ata_index = get_ata_index()
+if len(ata_index) == 0:
+    st.warning("No se encontró src/utils/ata.json. No se podrá mapear ATA → nombre.")
 # -------------------- Filtro de fechas (rango o manual) --------------------
 st.subheader("Filters")
 mode = st.radio("Date Range", ["Range", "Manual"], horizontal=True)
@@ -133,49 +59,21 @@ st.session_state.end_date = start   # inicio
 st.session_state.ini_date = end     # fin
 
 # -------------------- Aplicar filtros --------------------
-filtered_df = filter_data(df).copy()
+rows = filtered_rows(dataset)          # posiciones; se reutilizan en el detalle de la task
+filtered_df = dataset.take(rows)
 
 
-# -------------------- NUEVA COLUMNA BY ATA --------------------
-
-# -------------------- Location by ATA --------------------
-if "ata_chapter_code" in filtered_df.columns and len(ata_map) > 0:
-    keys_available = set(ata_map.keys())
-    filtered_df["location by ata"] = (
-        filtered_df["ata_chapter_code"]
-        .apply(lambda v: ata_map.get(extract_ata_chapter_key(v, keys_available), "no data"))
-        .astype("string")
-    )
-else:
-    filtered_df["location by ata"] = "no data"
-
 
 
 
-
-# Normaliza fechas
-if "Date" in filtered_df.columns:
-    filtered_df["Date"] = pd.to_datetime(filtered_df["Date"], errors="coerce")
-if "issue_date" in filtered_df.columns:
-    filtered_df["issue_date"] = pd.to_datetime(filtered_df["issue_date"], errors="coerce")
+# Las fechas ya vienen tipadas (datetime64) desde el esquema del dataset
 
 # --- ID de finding (F) ---  lo esto yusando apra contar findins unicos porqe si el set no lo tiene se va a inventar indices
 if "finding_id" not in filtered_df.columns:
-    filtered_df["finding_id"] = filtered_df.index.astype(str)
-else:
-    filtered_df["finding_id"] = filtered_df["finding_id"].astype(str)
+    filtered_df["finding_id"] = filtered_df.index
 
 # --- ID de ejecución (E): task_id + ac_registration_id + issue_date(día) ---
-if "issue_date" in filtered_df.columns and filtered_df["issue_date"].notna().any():
-    exec_day = filtered_df["issue_date"].dt.strftime("%Y-%m-%d").fillna("NA")
-elif "Date" in filtered_df.columns and filtered_df["Date"].notna().any():
-    exec_day = filtered_df["Date"].dt.strftime("%Y-%m-%d").fillna("NA")
-else:
-    exec_day = pd.Series(["NA"] * len(filtered_df))
-
-task = filtered_df.get("task_id", pd.Series(["NA"] * len(filtered_df))).astype(str).fillna("NA")
-reg  = filtered_df.get("ac_registration_id", pd.Series(["NA"] * len(filtered_df))).astype(str).fillna("NA")
-filtered_df["__exec_id__"] = task.str.cat(reg, sep="|").str.cat(exec_day, sep="|")
+# Se calcula como clave int64 sobre códigos enteros en src/task_stats.py (sin strings por fila)
 
 # -------------------- Stats por task y Top-10 --------------------
 st.markdown("### Top 10 tasks by **ratio (F/E)**")
@@ -185,11 +83,14 @@ if filtered_df.empty:
     st.warning("No data for the selected period.")
     st.stop()
 
-stats_by_task = (
-    filtered_df.groupby("task_id", dropna=False)
-    .agg(F=("finding_id", "nunique"), E=("__exec_id__", "nunique"))
-    .reset_index()
-)
+# Con la ventana de fechas y filtros de aeronave/task se combinan filas de la tabla
+# materializada (task, día); con filtros por finding se recalcula sobre las filas filtradas
+task_day_stats = get_task_day_stats(dataset)
+selections = current_selections(dataset.columns)
+if task_day_stats.supports(selections):
+    stats_by_task = task_day_stats.task_stats(start, end, selections)
+else:
+    stats_by_task = task_ratio_stats(filtered_df)
 stats_by_task = stats_by_task[stats_by_task["E"] > 0]
 if stats_by_task.empty:
     st.warning("No tasks with executions (E > 0) under the selected range.")
@@ -280,10 +181,14 @@ F_top = int(row_stat["F"].iloc[0]) if not row_stat.empty else 0
 E_top = int(row_stat["E"].iloc[0]) if not row_stat.empty else 0
 ratio_top = float(row_stat["ratio"].iloc[0]) if not row_stat.empty else 0.0
 
-task_block = filtered_df[filtered_df["task_id"] == selected_task_id].copy()
+# Filas de la task: posting list del índice de task_id dentro de las filas filtradas,
+# y una única selección sobre el dataset (sin recorrer filtered_df ni copiarlo)
+task_rows = group_rows(dataset, "task_id", selected_task_id, rows)
+task_block = dataset.take(task_rows)
+finding_ids = task_block["finding_id"] if "finding_id" in task_block.columns else task_block.index.to_series()
 
-F_calc = task_block["finding_id"].nunique()
-E_calc = task_block["__exec_id__"].nunique()
+F_calc = finding_ids.nunique()
+E_calc = len(np.unique(execution_ids(task_block)))
 ratio_calc = (F_calc / E_calc) if E_calc else 0.0
 
 st.write(
@@ -300,21 +205,22 @@ if (F_top != F_calc) or (E_top != E_calc):
 # ===== Distribuciones de Location y Aircraft Model =====
 c1, c2 = st.columns(2)
 
-# --- Location ---
-# --- Location ---
+# --- Location (vacíos -> "no data"); se usa también en el log de filas ---
 loc_col = "location" if "location" in task_block.columns else (
     "defect_location" if "defect_location" in task_block.columns else None
 )
+if loc_col:
+    location = task_block[loc_col].astype("string").fillna("no data")
+    location = location.mask(location.str.strip().eq(""), "no data")
+else:
+    location = pd.Series("no data", index=task_block.index, dtype="string")
+
 with c1:
     if loc_col:
-        tmp = task_block.copy()
-        tmp[loc_col] = tmp[loc_col].astype("string").fillna("no data")
-        tmp.loc[tmp[loc_col].str.strip().eq(""), loc_col] = "no data"
-
         loc_df = (
-            tmp.groupby(loc_col, dropna=False)["finding_id"]
-               .nunique()
-               .reset_index(name="#Findings")
+            finding_ids.groupby(location.rename(loc_col))
+                       .nunique()
+                       .reset_index(name="#Findings")
         )
         total_for_pct = F_calc if F_calc > 0 else int(loc_df["#Findings"].sum())
         # calcula primero el % que muestras
@@ -347,7 +253,7 @@ with c1:
 with c2:
     if "ac_model" in task_block.columns:
         mod_df = (
-            task_block.groupby("ac_model", dropna=False)["finding_id"]
+            finding_ids.groupby(task_block["ac_model"], dropna=False, observed=True)
                       .nunique()
                       .reset_index(name="#Findings")
                       .sort_values("#Findings", ascending=False)
@@ -373,30 +279,19 @@ with c2:
 # -------------------- Log de filas (detalle de findings) --------------------
 st.markdown("**Records (findings) of the selected task**")
 
-detail_df = task_block.copy()
-
 # --- Date a mostrar: prioriza issue_date y si no, usa Date ---
-if "issue_date" in detail_df.columns and detail_df["issue_date"].notna().any():
-    detail_df["Date_out"] = pd.to_datetime(detail_df["issue_date"], errors="coerce")
-elif "Date" in detail_df.columns:
-    detail_df["Date_out"] = pd.to_datetime(detail_df["Date"], errors="coerce")
-else:
-    detail_df["Date_out"] = pd.NaT  # si no hay ninguna
-
-# --- Location a mostrar: usa 'location', si no 'defect_location'; rellena vacíos con "no data" ---
-loc_col = "location" if "location" in detail_df.columns else (
-    "defect_location" if "defect_location" in detail_df.columns else None
-)
-if loc_col:
-    detail_df["Location_out"] = detail_df[loc_col].astype("string").fillna("no data")
-    detail_df.loc[detail_df["Location_out"].str.strip().eq(""), "Location_out"] = "no data"
+if "issue_date" in task_block.columns and task_block["issue_date"].notna().any():
+    date_out = task_block["issue_date"]
+elif "Date" in task_block.columns:
+    date_out = task_block["Date"]
 else:
-    detail_df["Location_out"] = "no data"
+    date_out = pd.Series(pd.NaT, index=task_block.index)  # si no hay ninguna
 
-if "location by ata" in filtered_df.columns:
-    detail_df["location by ata"] = filtered_df.loc[detail_df.index, "location by ata"].astype("string")
+# --- Location (by ATA): sólo para los códigos de la task seleccionada ---
+if "ata_chapter_code" in task_block.columns and len(ata_index) > 0:
+    ata_location = ata_index.chapter_names(task_block["ata_chapter_code"]).astype("string")
 else:
-    detail_df["location by ata"] = "no data"
+    ata_location = pd.Series("no data", index=task_block.index, dtype="string")
 
 # --- Description Failure: elegimos la mejor columna disponible ---
 # orden de preferencia (ajústalo si tu CSV usa otro nombre)
@@ -404,13 +299,21 @@ desc_col = next(
     (c for c in [
         "failure_description", "finding_description", "description",
         "description_failure", "defect_reason"
-    ] if c in detail_df.columns),
+    ] if c in task_block.columns),
     None
 )
 if desc_col:
-    detail_df["Description Failure"] = detail_df[desc_col].astype("string")
+    description = task_block[desc_col].astype("string")
 else:
-    detail_df["Description Failure"] = ""  # si no hay ninguna columna descriptiva
+    description = pd.Series("", index=task_block.index, dtype="string")  # si no hay ninguna columna descriptiva
+
+# Columnas derivadas del log; el resto se leen directamente del bloque de la task
+detail_cols = {
+    "Date_out": date_out,
+    "Location_out": location,
+    "location by ata": ata_location,
+    "Description Failure": description,
+}
 
 # --- Nombres que pidio Alex ---
 display_cols_map = {
@@ -426,22 +329,21 @@ display_cols_map = {
 }
 
 # selecciona solo las claves que existan en el DataFrame
-sel_keys = [k for k in display_cols_map.keys() if k in detail_df.columns]
-out_df = detail_df[sel_keys].rename(columns=display_cols_map)
+out_df = pd.DataFrame({
+    display_cols_map[k]: detail_cols[k] if k in detail_cols else task_block[k]
+    for k in display_cols_map
+    if k in detail_cols or k in task_block.columns
+})
 
 # Orden: Date primero; si quieres otro orden, reordena aquí
 desired_order = ["Date", "Task", "Aircraft Type", "ATA", "A/C", "Location", "Location (by ATA)", "Description Failure", "exec_id"]
 out_df = out_df[[c for c in desired_order if c in out_df.columns]]
 
-# Ordena por fecha si existe; si no, deja como está
-if "Date" in out_df.columns:
-    out_df = out_df.sort_values("Date")
-
-
-st.dataframe(
+# Paginada y ordenada en el servidor (por fecha si existe): sólo se envía la página visible
+paged_dataframe(
     out_df,
-    use_container_width=True,
-    hide_index=True,
+    key="task_records",
+    sort_by="Date",
     column_config={
         "Date": st.column_config.DatetimeColumn("Date", format="YYYY-MM-DD", width="small"),
         "Task": st.column_config.TextColumn("Task", width="medium"),
@@ -453,3 +355,55 @@ st.dataframe(
         "exec_id": st.column_config.TextColumn("exec_id", width="medium"),
     },
 )
+
+# -------------------- Findings parecidos (índice LSH sobre el texto) --------------------
+# El índice (features TF-IDF + LSH en disco) se construye la primera vez que se abre el panel
+show_similar = st.toggle("Similar findings across the fleet", value=False, key="similar_show")
+if show_similar:
+    st.caption("Findings whose failure description, description and action text are closest to the selected record.")
+
+    s1, s2, s3 = st.columns([4, 1, 1])
+    with s1:
+        record_pos = st.selectbox(
+            "Record",
+            options=range(len(task_rows)),
+            format_func=lambda i: " · ".join([
+                str(date_out.iloc[i].date()) if pd.notna(date_out.iloc[i]) else "no date",
+                str(task_block["ac_registration_id"].iloc[i]) if "ac_registration_id" in task_block.columns else "",
+                str(description.iloc[i])[:80],
+            ]),
+            index=max(len(task_rows) - 1, 0),   # el más reciente (filas en orden por fecha)
+            key="similar_record",
+        )
+    with s2:
+        n_similar = st.number_input("Similar texts", min_value=1, max_value=50, value=10, key="similar_k")
+    with s3:
+        earlier_only = st.checkbox("Only earlier findings", value=True, key="similar_earlier")
+
+    if record_pos is not None:
+        with st.spinner("Searching similar findings..."):
+            similar = similar_findings(dataset, int(task_rows[record_pos]), k=int(n_similar), earlier_only=earlier_only)
+        if similar.empty:
+            st.info("No similar findings for the selected record.")
+        else:
+            paged_dataframe(
+                similar,
+                key="similar_findings",
+                columns=["similarity", "Date", "task_id", "ac_registration_id", "ata_chapter_code",
+                         "description_failure", "description_text", "action_text"],
+                labels={
+                    "similarity": "Similarity",
+                    "task_id": "Task",
+                    "ac_registration_id": "A/C",
+                    "ata_chapter_code": "ATA",
+                    "description_failure": "Description Failure",
+                    "description_text": "Description",
+                    "action_text": "Action Details",
+                },
+                column_config={
+                    "Similarity": st.column_config.NumberColumn("Similarity", format="%.3f", width="small"),
+                    "Date": st.column_config.DatetimeColumn("Date", format="YYYY-MM-DD", width="small"),
+                },
+                sort_by="similarity",
+                descending=True,
+            )
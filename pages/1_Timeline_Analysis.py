@@ -1,14 +1,17 @@
 import streamlit as st
 from plotly import graph_objects as go
-from src.data_load import get_local_csv_data
+from src.data_load import get_dataset
 import pandas as pd
 from datetime import date, timedelta
-from src.utils import set_base_session_sates, filter_data
+from src.utils import (set_base_session_sates, filter_data, facet_multiselects, paged_dataframe,
+                       current_filter_key, current_selections, current_window)
+from src.rollups import FREQ_LABELS, rollup_series
+from src.plot_utils import POINT_BUDGET, timeseries_trace
 
 set_base_session_sates()
 
 # Data Loading
-df = get_local_csv_data().copy()
+dataset = get_dataset()   # compartido y de sólo lectura
 
 # Input Selection
 input1, input2, input3, input4 = st.columns(4)
@@ -30,74 +33,65 @@ with input1:
     # Si hay 1 fecha no hacer nada!!!!!!!!!!!!!!!
 
     st.session_state.group = st.checkbox("Group data?", value=True)
-with input2:
-    st.session_state.ac_model = st.multiselect("Select Aircraft Model", 
-                                options = df["ac_model"].unique())
-with input3:
-    st.session_state.ac_description = st.multiselect("Select Aircraft Description", 
-                                options = df["aircraft_description"].unique())
-with input4:
-    st.session_state.reg_number = st.multiselect("Select Registration Number", 
-                                    options = df["ac_registration_id"].unique())
-with input5:
-    st.session_state.finding_source = st.multiselect("Select Finding Source", 
-                                options = df["finding_source"].unique())
-with input6:
-    st.session_state.ata = st.multiselect("Select ATA Code Chapter", 
-                                options = df["ata_chapter_code"].unique())
-with input7:
-    st.session_state.taskcard = st.multiselect("Select Taskcard", 
-                                options = df["task_id"].unique())
-with input8:
-    st.session_state.amm_code = st.multiselect("Select AMM Code", 
-                                    options = df["amm_reference"].unique())
-
-
-filtered_df = filter_data(df)
-
-unique_days = filtered_df['Date'].nunique()
-
-if st.session_state.group:
-    if unique_days > 150:
-        # Group by month
-        filtered_df['period'] = filtered_df['Date'].dt.to_period('M').dt.to_timestamp()
-        group_label = 'Month'
-    elif unique_days > 30:
-        # Group by week
-        filtered_df['period'] = filtered_df['Date'].dt.to_period('W').dt.start_time
-        group_label = 'Week'
-    else:
-        # Group by day
-        filtered_df['period'] = filtered_df['Date'].dt.normalize()
-        group_label = 'Day'
-else:
-    # Group by day
-    filtered_df['period'] = filtered_df['Date'].dt.normalize()
-    group_label = 'Day'
 
-# Then when displaying, format the output
-filtered_df['period'] = filtered_df['period'].dt.strftime('%Y-%m-%d')
+# Filtros facetados: opciones con número de findings bajo el resto de filtros
+facet_multiselects(dataset, [
+    (input2, "Select Aircraft Model", "ac_model", "ac_model"),
+    (input3, "Select Aircraft Description", "aircraft_description", "ac_description"),
+    (input4, "Select Registration Number", "ac_registration_id", "reg_number"),
+    (input5, "Select Finding Source", "finding_source", "finding_source"),
+    (input6, "Select ATA Code Chapter", "ata_chapter_code", "ata"),
+    (input7, "Select Taskcard", "task_id", "taskcard"),
+    (input8, "Select AMM Code", "amm_reference", "amm_code"),
+])
+
+
+filtered_df = filter_data(dataset)
+
+# Serie desde el rollup diario (conteos por día y combinación de filtros, calculado una
+# vez por versión del dataset); semana y mes se re-agregan desde los bins diarios
+start, end = current_window()
+selections = current_selections(dataset.columns)
+daily = rollup_series(dataset, selections, start, end, "D")
+unique_days = len(daily)
+
+if st.session_state.group and unique_days > 150:
+    freq = "M"   # Group by month
+elif st.session_state.group and unique_days > 30:
+    freq = "W"   # Group by week
+else:
+    freq = "D"   # Group by day
+group_label = FREQ_LABELS[freq]
+series = daily if freq == "D" else rollup_series(dataset, selections, start, end, freq)
 
-grouped = filtered_df.groupby('period').size().reset_index(name='Count')
-grouped.rename(columns={'period': 'Period'}, inplace=True)
+# Formato sólo de las etiquetas de periodo (una por periodo, no por fila)
+grouped = pd.DataFrame({'Period': series.index.strftime('%Y-%m-%d'), 'Count': series.to_numpy()})
 
 col1, col2, col3 = st.columns([3, 1, 1], vertical_alignment = "center")
 
 with col1:
+    # Ventana de zoom: dentro de ella se vuelve a resolución completa en cuanto los
+    # puntos caben en el presupuesto (por encima, Scattergl + LTTB)
+    plot_series = series
+    if len(series) > POINT_BUDGET:
+        first, last = series.index[0].date(), series.index[-1].date()
+        zoom = st.session_state.get("timeline_zoom", (first, last))
+        st.session_state["timeline_zoom"] = (min(max(zoom[0], first), last), max(min(zoom[1], last), first))
+        zoom_start, zoom_end = st.slider("Zoom window", min_value=first, max_value=last, key="timeline_zoom")
+        plot_series = series.loc[pd.Timestamp(zoom_start):pd.Timestamp(zoom_end)]
+
+    trace, downsampled = timeseries_trace(plot_series, mode='lines+markers')
     fig_1 = go.Figure()
-    fig_1.add_trace(
-        go.Scatter(
-            x=grouped['Period'],
-            y=grouped['Count'],
-            mode='lines+markers'
-        )
-    )
+    fig_1.add_trace(trace)
     fig_1.update_layout(
     autosize=False,
     height=600,
     )
 
     st.plotly_chart(fig_1, config = {'scrollZoom': False})
+    if downsampled:
+        st.caption(f"Showing {POINT_BUDGET:,} of {len(plot_series):,} points (LTTB). "
+                   f"Narrow the zoom window to see full resolution.")
 
 with col2:
     st.dataframe(grouped)
@@ -144,8 +138,12 @@ column_rename_map = {
     'failure_type': "Failure Type",
     'failure_risk': "Failure Risk",
     'extraction_error': "Extraction Error",
-    'period' : 'Period'
 }
 
-show_df = filtered_df.rename(columns=column_rename_map)
-st.dataframe(show_df)
+# Paginada en el servidor: sólo la página visible viaja al navegador
+paged_dataframe(
+    filtered_df,
+    key="timeline_records",
+    labels=column_rename_map,
+    cache_key=current_filter_key(dataset),
+)
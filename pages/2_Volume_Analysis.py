@@ -1,14 +1,14 @@
 import streamlit as st
 from plotly import graph_objects as go
-from src.data_load import get_data_va_1, get_data_va_2, get_local_csv_data
+from src.data_load import get_data_va_1, get_data_va_2, get_dataset
+from src.rollups import pair_top_k
 import pandas as pd
-from src.utils import set_base_session_sates,change_verbose_to_code
+from src.utils import set_base_session_sates, change_verbose_to_code, current_window
 
 set_base_session_sates()
 
 # Data Loading
-df = get_local_csv_data().copy()
-df['Date'] = pd.to_datetime(df['Date'])
+dataset = get_dataset()   # compartido y de sólo lectura
 
 
 # Input Section
@@ -39,13 +39,9 @@ main_groupby_feature = change_verbose_to_code(main_agg)
 second_groupby_feature = change_verbose_to_code(secondary_agg)
 
 
-# Data Grouping
-if main_groupby_feature == second_groupby_feature:
-    grouped_df_ = df.groupby([main_groupby_feature]).size().reset_index(name="Findings")
-else:
-    grouped_df_ = df.groupby([second_groupby_feature, main_groupby_feature]).size().reset_index(name="Findings")
-
-grouped_df_ = grouped_df_.sort_values("Findings", ascending=False).head(10)
+# Data Grouping: cubo (día x dimensiones) cortado a la ventana; top-10 por cada eje
+start, end = current_window()
+top_main, heatmap_data = pair_top_k(dataset, main_groupby_feature, second_groupby_feature, start, end, k=10)
 
 
 # Visualization
@@ -53,8 +49,8 @@ col1, col2 = st.columns(2)
 
 with col1:
     fig = go.Figure(go.Bar(
-        x=grouped_df_["Findings"],
-        y=grouped_df_[main_groupby_feature],
+        x=top_main.to_numpy(),
+        y=top_main.index,
         orientation="h"))
 
     fig.update_layout(
@@ -66,19 +62,7 @@ with col1:
     st.plotly_chart(fig, use_container_width=True)
 
 with col2:
-    # Data Pivoting for heatmap (limit to top 10 for both axes)
-    top_rows = grouped_df_[main_groupby_feature].unique()[:10]
-    top_cols = grouped_df_[second_groupby_feature].unique()[:10]
-
-    # Data Pivoting
-    heatmap_data = grouped_df_.pivot_table(
-        index=main_groupby_feature,
-        columns=second_groupby_feature,
-        values="Findings",
-        aggfunc="sum",
-        fill_value=0
-    ).loc[top_rows, top_cols]
-
+    # Heatmap: top 10 of both axes, already sliced from the cube
     # Build heatmap
     fig = go.Figure(data=go.Heatmap(
     z=heatmap_data.values,
@@ -1,3 +1,187 @@
 import streamlit as st
+from plotly import graph_objects as go
+import pandas as pd
+import numpy as np
 
-st.title("Clusering Analysis is Work In Progress")
\ No newline at end of file
+from src.data_load import get_dataset
+from src.ata_index import get_ata_index
+from src.utils import (set_base_session_sates, facet_multiselects, filtered_rows,
+                       current_filter_key, paged_dataframe)
+from src.text_clusters import (CLUSTER_CACHE, OUTLIER_SIMILARITY, ClusterResult, cluster_findings, cluster_summary,
+                               get_text_features)
+from src.incremental_clusters import get_incremental_clusters
+
+set_base_session_sates()
+
+# Data Loading
+dataset = get_dataset()   # compartido y de sólo lectura
+ata_index = get_ata_index()
+
+st.title("Clustering Analysis")
+st.caption("Findings grouped by the text of their failure description, description and action.")
+
+# Input Section - Filters
+input1, input2, input3, input4 = st.columns(4)
+input5, input6, input7, _ = st.columns(4)
+
+with input1:
+    date_interval = st.date_input(
+        "Time Window",
+        (st.session_state.ini_date, st.session_state.end_date),
+        min_value=None,
+        max_value=None
+    )
+
+    # Actualiza SOLO cuando el rango está completo (2 fechas)
+    if isinstance(date_interval, (list, tuple)) and len(date_interval) == 2:
+        start, end = sorted(date_interval)
+        st.session_state.ini_date = start
+        st.session_state.end_date = end
+
+facet_multiselects(dataset, [
+    (input2, "Select Aircraft Model", "ac_model", "ac_model"),
+    (input3, "Select Registration Number", "ac_registration_id", "reg_number"),
+    (input4, "Select ATA Code Chapter", "ata_chapter_code", "ata"),
+    (input5, "Select Finding Source", "finding_source", "finding_source"),
+])
+
+with input6:
+    n_clusters = st.slider("Number of clusters", min_value=2, max_value=30, value=10)
+with input7:
+    mode = st.radio(
+        "Model",
+        ["Fit on selection", "Global model (incremental)"],
+        help="The global model is fitted on all findings and only assigns new ones; "
+             "it is re-fitted when drift crosses the threshold.",
+    )
+
+rows = filtered_rows(dataset)
+positions = np.arange(len(dataset))[rows]
+if len(positions) == 0:
+    st.warning("No data for the selected period.")
+    st.stop()
+
+# Features TF-IDF (una vez por versión, cacheadas en disco) y ajuste por selección de filtros
+with st.spinner("Clustering findings..."):
+    features = get_text_features(dataset)
+    if mode == "Fit on selection":
+        result = CLUSTER_CACHE.get_or_compute(
+            ("clusters", n_clusters) + current_filter_key(dataset),
+            lambda: cluster_findings(features, positions, n_clusters),
+        )
+        frame = dataset.take(result.positions)
+    else:
+        # Asignaciones del modelo global (sólo se asignan las filas nuevas de cada versión)
+        model_state = get_incremental_clusters(dataset, n_clusters)
+        frame = dataset.take(positions)
+        labels, similarity = model_state.lookup(frame)
+        result = ClusterResult(model_state.model(), positions, labels, similarity)
+        st.caption("Drift since last fit: " + " · ".join(
+            f"{name.replace('_', ' ')} {value:.3f}" for name, value in model_state.drift().items()))
+
+if "ata_chapter_code" in frame.columns and len(ata_index) > 0:
+    ata_names = ata_index.chapter_names(frame["ata_chapter_code"])
+else:
+    ata_names = pd.Series("no data", index=frame.index)
+
+tails = frame["ac_registration_id"] if "ac_registration_id" in frame.columns else None
+summary = cluster_summary(result, features.terms, ata_names, tails)
+
+# -------------------- Resumen de clusters --------------------
+st.subheader("Clusters")
+col1, col2 = st.columns([2, 3])
+
+with col1:
+    labels = [f"#{c}" if c >= 0 else "no text" for c in summary.index]
+    fig = go.Figure(go.Bar(
+        x=summary["Findings"],
+        y=labels,
+        orientation="h",
+        text=summary["Top terms"].str.split(", ").str[:3].str.join(", "),
+        textposition="auto",
+    ))
+    fig.update_layout(
+        title="Findings per cluster",
+        xaxis_title="Findings",
+        yaxis=dict(autorange="reversed", type="category"),
+        height=500,
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+with col2:
+    st.dataframe(
+        summary.reset_index(names="Cluster"),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Cluster": st.column_config.NumberColumn("Cluster", format="%d", width="small"),
+            "Findings": st.column_config.NumberColumn("Findings", format="%d", width="small"),
+            "% of Findings": st.column_config.NumberColumn("% of Findings", format="%.2f %%", width="small"),
+            "Cohesion": st.column_config.NumberColumn("Cohesion", format="%.3f", width="small"),
+            "Outliers": st.column_config.NumberColumn(
+                "Outliers", format="%d", width="small",
+                help=f"Findings with similarity < {OUTLIER_SIMILARITY} to the centroid"),
+            "Top terms": st.column_config.TextColumn("Top terms", width="large"),
+            "Top ATA chapters": st.column_config.TextColumn("Top ATA chapters", width="large"),
+            "Aircraft": st.column_config.NumberColumn("Aircraft", format="%d", width="small",
+                                                      help="Distinct tails (aircraft registrations) in the cluster"),
+            "Top tails": st.column_config.TextColumn("Top tails", width="large"),
+        },
+    )
+
+# -------------------- Detalle de un cluster --------------------
+selected = st.selectbox(
+    "Cluster detail",
+    options=list(summary.index),
+    format_func=lambda c: f"#{c} · {summary.loc[c, 'Top terms']}" if c >= 0 else "no text",
+)
+in_cluster = result.labels == selected
+members = frame[in_cluster].assign(similarity=result.similarity[in_cluster])
+
+c1, c2 = st.columns([1, 2])
+with c1:
+    ata_counts = ata_names[in_cluster].value_counts()
+    ata_counts = ata_counts[ata_counts > 0].head(10)
+    fig = go.Figure(go.Bar(x=ata_counts.to_numpy(), y=ata_counts.index.astype(str), orientation="h"))
+    fig.update_layout(
+        title="Findings by ATA chapter",
+        xaxis_title="Findings",
+        yaxis=dict(autorange="reversed", type="category"),
+        height=400,
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    if tails is not None:
+        tail_counts = tails[in_cluster].astype("string").fillna("no data").value_counts().head(10)
+        fig = go.Figure(go.Bar(x=tail_counts.to_numpy(), y=tail_counts.index.astype(str), orientation="h"))
+        fig.update_layout(
+            title="Findings by tail",
+            xaxis_title="Findings",
+            yaxis=dict(autorange="reversed", type="category"),
+            height=400,
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+with c2:
+    st.markdown("**Findings of the cluster** (sort by similarity ascending to see the outliers)")
+    paged_dataframe(
+        members,
+        key="cluster_members",
+        columns=["similarity", "Date", "task_id", "ac_registration_id", "ata_chapter_code",
+                 "description_failure", "description_text", "action_text"],
+        labels={
+            "similarity": "Similarity",
+            "task_id": "Task Card",
+            "ac_registration_id": "Aircraft Registration",
+            "ata_chapter_code": "ATA Chapter",
+            "description_failure": "Failure Description",
+            "description_text": "Description",
+            "action_text": "Action Details",
+        },
+        column_config={
+            "Similarity": st.column_config.NumberColumn("Similarity", format="%.3f"),
+            "Date": st.column_config.DatetimeColumn("Date", format="YYYY-MM-DD"),
+        },
+        sort_by="similarity",
+        descending=True,
+    )
@@ -2,15 +2,17 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from src.data_load import get_local_csv_data
+from src.data_load import get_dataset
 import pandas as pd
-from src.utils import set_base_session_sates, filter_data
+from src.utils import (set_base_session_sates, filter_data, facet_multiselects, paged_dataframe,
+                       current_filter_key, current_selections, current_window)
+from src.heavy_hitters import top_values
 import numpy as np
 
 set_base_session_sates()
 
 # Data Loading
-df = get_local_csv_data().copy()
+dataset = get_dataset()   # compartido y de sólo lectura
 
 # Input Section - Filters
 input1, input2, input3, input4 = st.columns(4)
@@ -29,18 +31,18 @@ with input1:
         st.session_state.ini_date = start
         st.session_state.end_date = end
 
-with input2:
-    st.session_state.ac_model = st.multiselect("Select Aircraft Model", 
-                                options = df["ac_model"].unique())
-with input3:
-    st.session_state.reg_number = st.multiselect("Select Registration Number", 
-                                    options = df["ac_registration_id"].unique())
-with input4:
-    st.session_state.taskcard = st.multiselect("Select Taskcard", 
-                                options = df["task_id"].unique())
+
+# Filtros facetados: opciones con número de findings bajo el resto de filtros
+facet_multiselects(dataset, [
+    (input2, "Select Aircraft Model", "ac_model", "ac_model"),
+    (input3, "Select Registration Number", "ac_registration_id", "reg_number"),
+    (input4, "Select Taskcard", "task_id", "taskcard"),
+])
 
 # Apply filters
-filtered_df = filter_data(df)
+filtered_df = filter_data(dataset)
+start, end = current_window()
+selections = current_selections(dataset.columns)
 
 # Main Content - Distribution Analysis
 st.subheader("Defect Categories Distribution")
@@ -49,7 +51,8 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Defect Categories Bar Chart
-    defect_counts = filtered_df["defect_category"].value_counts().head(10)
+    # Top-k exacto desde los conteos diarios (ventana + filtros), sin recorrer filtered_df
+    defect_counts = top_values(dataset, "defect_category", selections, start, end, k=10)
     
     fig_bar = go.Figure(go.Bar(
         x=defect_counts.values,
@@ -74,7 +77,7 @@ with col1:
 
 with col2:
     # Top 10 Specific Defects
-    specific_defect_counts = filtered_df["defect_specific_code"].value_counts().head(10)
+    specific_defect_counts = top_values(dataset, "defect_specific_code", selections, start, end, k=10)
     
     fig_specific = go.Figure(go.Bar(
         x=specific_defect_counts.index,
@@ -116,8 +119,12 @@ column_rename_map = {
 display_columns = ['work_order_id', 'ac_registration_id', 'ac_model', 'defect_category', 
                   'defect_specific_code', 'location', 'ata_chapter_code', 'description_failure', 'Date']
 
-show_df = filtered_df[display_columns].copy()
-# Format Date column to yyyy-mm-dd
-show_df['Date'] = show_df['Date'].dt.strftime('%Y-%m-%d')
-show_df = show_df.rename(columns=column_rename_map)
-st.dataframe(show_df, use_container_width=True, hide_index=True)
\ No newline at end of file
+# Paginated server-side: only the visible page is sent to the browser
+paged_dataframe(
+    filtered_df,
+    key="defects_records",
+    columns=display_columns,
+    labels=column_rename_map,
+    column_config={"Date": st.column_config.DatetimeColumn("Date", format="YYYY-MM-DD")},
+    cache_key=current_filter_key(dataset),
+)
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Benchmark del modo incremental de clustering: ajusta sobre la parte inicial del dataset
+(en orden de fecha) y lo hace crecer por lotes, midiendo la latencia de asignación de las
+filas nuevas, el drift acumulado y cuándo se dispararía un re-ajuste completo.
+
+    python scripts/benchmark_incremental_clusters.py --initial 0.5 --batches 10 --out bench.json
+
+No toca el modelo de clusters ni las features guardadas por la app (se calculan en memoria).
+El CSV sí se lee como la app: si no hay snapshot Parquet de su versión, se crea (con su
+manifiesto) en src/data/.cache, y la app lo reutiliza.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.data_load import DATA_PATH, _load_snapshot, get_source_version  # noqa: E402
+from src.incremental_clusters import DRIFT_THRESHOLDS, IncrementalClusters  # noqa: E402
+from src.text_clusters import TextFeatures  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", type=Path, default=DATA_PATH)
+    parser.add_argument("--initial", type=float, default=0.5, help="fracción de filas del ajuste inicial")
+    parser.add_argument("--batches", type=int, default=10, help="nº de lotes en que llega el resto")
+    parser.add_argument("--clusters", type=int, default=10)
+    parser.add_argument("--refit", action="store_true", help="re-ajustar de verdad cuando lo pida el drift")
+    parser.add_argument("--out", type=Path, help="JSON con los resultados")
+    args = parser.parse_args()
+
+    df = _load_snapshot(args.csv, get_source_version(args.csv))
+    n0 = int(len(df) * args.initial)
+
+    start = time.perf_counter()
+    state = IncrementalClusters.fit(df.iloc[:n0], TextFeatures.build(df.iloc[:n0]), args.clusters)
+    fit_seconds = time.perf_counter() - start
+    print(f"Ajuste inicial: {n0:,} filas en {fit_seconds:.2f} s")
+
+    results = []
+    bounds = [n0 + round(i * (len(df) - n0) / args.batches) for i in range(args.batches + 1)]
+    for i, upto in enumerate(bounds[1:], start=1):
+        entry = state.update(df.iloc[:upto])
+        entry["batch"] = i
+        if entry["refit"] and args.refit:
+            start = time.perf_counter()
+            state = IncrementalClusters.fit(df.iloc[:upto], TextFeatures.build(df.iloc[:upto]), args.clusters)
+            entry["refit_seconds"] = round(time.perf_counter() - start, 3)
+        results.append(entry)
+
+    table = pd.DataFrame(results).set_index("batch").drop(columns=["time"])
+    print(table.to_string())
+    print(f"Umbrales: {DRIFT_THRESHOLDS}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"initial_rows": n0, "fit_seconds": round(fit_seconds, 3),
+                       "thresholds": DRIFT_THRESHOLDS, "batches": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ATA_JSON_PATH = Path(__file__).resolve().parent / "utils" / "ata.json"
+
+# Columnas que devuelve AtaIndex.resolve (una por nivel: capítulo, sección y subject)
+ATA_LEVEL_COLUMNS = [
+    "ata_chapter", "ata_chapter_name", "ata_category",
+    "ata_section", "ata_section_title",
+    "ata_subject", "ata_subject_title",
+]
+
+
+class AtaIndex:
+    """
+    Índice jerárquico de src/utils/ata.json (capítulo -> sección -> subject).
+
+    Las claves se codifican como enteros (capítulo*100 + sección, capítulo*10000 +
+    sección*100 + subject) en tablas ordenadas, de modo que un lote de códigos como
+    '27-50-00', '115-20' o '05-10' se resuelve con un searchsorted por nivel. Los rangos
+    del JSON ('-10..-90') son intervalos de esa tabla.
+    """
+
+    def __init__(self, chapters: list):
+        chap_rows, sec_rows, sub_rows = [], [], []
+        for ch in chapters:
+            num = str(ch.get("chapter_number") or ch.get("chapter") or ch.get("code") or "").strip()
+            name = ch.get("chapter_name") or ch.get("name")
+            m = re.match(r"^(\d{1,3})", num)
+            if not m or not name:
+                continue
+            c = int(m.group(1))
+            chap_rows.append((c, name, ch.get("category")))
+            for sec in ch.get("sections") or []:
+                parts = [[int(n) for n in re.findall(r"\d+", p)] for p in str(sec.get("section", "")).split("..")]
+                lo, hi = parts[0], parts[-1]
+                title = sec.get("title")
+                if len(lo) == 1 and len(hi) == 1:
+                    sec_rows.append((c * 100 + lo[0], c * 100 + hi[0], title))
+                elif len(lo) == 2 and len(hi) == 2:
+                    sub_rows.append((c * 10000 + lo[0] * 100 + lo[1], c * 10000 + hi[0] * 100 + hi[1], title))
+
+        chap = pd.DataFrame(chap_rows, columns=["key", "name", "category"]).drop_duplicates("key")
+        self._chapters = chap.set_index("key")
+        # capítulos de 3 dígitos (100-115): '071' se sigue leyendo como capítulo 07
+        self._three_digit = set(chap.loc[chap["key"] >= 100, "key"])
+        self._sections = self._interval_table(sec_rows)
+        self._subjects = self._interval_table(sub_rows)
+
+    @staticmethod
+    def _interval_table(rows: list) -> tuple:
+        rows = sorted(rows)
+        starts = np.array([r[0] for r in rows], dtype=np.int64)
+        ends = np.array([r[1] for r in rows], dtype=np.int64)
+        titles = np.array([r[2] for r in rows], dtype=object)
+        return starts, ends, titles
+
+    @staticmethod
+    def _interval_lookup(table: tuple, keys: np.ndarray) -> np.ndarray:
+        starts, ends, titles = table
+        out = np.full(len(keys), None, dtype=object)
+        if len(starts) == 0:
+            return out
+        valid = keys >= 0
+        pos = np.searchsorted(starts, keys, side="right") - 1
+        hit = valid & (pos >= 0)
+        hit[hit] &= keys[hit] <= ends[pos[hit]]
+        out[hit] = titles[pos[hit]]
+        return out
+
+    def __len__(self) -> int:
+        return len(self._chapters)
+
+    def chapter_map(self) -> dict:
+        """{'05': 'TIME LIMITS/MAINTENANCE CHECKS', ..., '115': ...} (claves de 2 y 3 dígitos)."""
+        out = {}
+        for c, name in self._chapters["name"].items():
+            out[str(c).zfill(2)] = name
+            if c >= 100:
+                out[str(c).zfill(3)] = name
+        return out
+
+    def lookup_codes(self, codes) -> pd.DataFrame:
+        """Resuelve una lista de códigos ATA (normalmente los distintos) a los tres niveles."""
+        s = pd.Series(codes, dtype=object).astype("string").str.strip()
+        # grupos de dígitos separados por espacio, '-', '_' o '.', ignorando prefijos ('ZL_05', 'ATA 32-11')
+        groups = s.str.extract(r"^\D*(\d+)(?:[\s\-_.]+(\d+))?(?:[\s\-_.]+(\d+))?").fillna("")
+        first, second, third = groups[0], groups[1], groups[2]
+        n_first = first.str.len().to_numpy()
+
+        # capítulo sólo del primer grupo (2 dígitos, o 3 si el grupo los tiene y es un capítulo 100-115)
+        d3 = pd.to_numeric(first.str[:3], errors="coerce").to_numpy(dtype=float)
+        d2 = pd.to_numeric(first.str[:2], errors="coerce").to_numpy(dtype=float)
+        use3 = (n_first >= 3) & pd.Series(d3).isin(self._three_digit).to_numpy()
+        chapter = np.where(use3, d3, np.where(n_first >= 2, d2, np.nan))
+        known = pd.Series(chapter).isin(self._chapters.index).to_numpy()
+        chapter = np.where(known, chapter, -1).astype(np.int64)
+
+        # sección/subject: resto del primer grupo si es compacto ('2750', '275000'), si no los grupos siguientes
+        rest = pd.Series(np.where(use3, first.str[3:], first.str[2:]), dtype="string")
+        compact = (rest.str.len() >= 2).to_numpy()
+        sec_str = pd.Series(np.where(compact, rest.str[:2], second.where(second.str.len() == 2, "")), dtype="string")
+        sub_str = pd.Series(np.where(compact, rest.str[2:4].where(rest.str.len() >= 4, ""),
+                                     third.where(third.str.len() == 2, "")), dtype="string")
+        sec = pd.to_numeric(sec_str.replace("", pd.NA), errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+        sub = pd.to_numeric(sub_str.replace("", pd.NA), errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+        has_sec = known & (sec >= 0)
+        has_sub = has_sec & (sub >= 0)
+
+        sec_keys = np.where(has_sec, chapter * 100 + sec, -1)
+        sub_keys = np.where(has_sub, chapter * 10000 + sec * 100 + sub, -1)
+        chap_info = self._chapters.reindex(np.where(known, chapter, -1))
+
+        def _key(mask, *parts):
+            return ["-".join(str(p[i]).zfill(2) for p in parts) if mask[i] else None for i in range(len(mask))]
+
+        return pd.DataFrame({
+            "ata_chapter": _key(known, chapter),
+            "ata_chapter_name": chap_info["name"].to_numpy(),
+            "ata_category": chap_info["category"].to_numpy(),
+            "ata_section": _key(has_sec, chapter, sec),
+            "ata_section_title": self._interval_lookup(self._sections, sec_keys),
+            "ata_subject": _key(has_sub, chapter, sec, sub),
+            "ata_subject_title": self._interval_lookup(self._subjects, sub_keys),
+        }, index=s.index)
+
+    def resolve(self, values: pd.Series) -> pd.DataFrame:
+        """
+        Niveles ATA por fila. Se resuelve una vez por código distinto y se propaga a las
+        filas con los códigos de categoría (columnas categóricas, coste ~ nº de códigos).
+        """
+        cat = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype("category")
+        per_code = self.lookup_codes(list(cat.cat.categories.astype(str)))
+        codes = cat.cat.codes.to_numpy()
+        out = {}
+        for col in ATA_LEVEL_COLUMNS:
+            col_codes, col_cats = pd.factorize(per_code[col])
+            col_codes = np.append(col_codes, -1)   # código -1 (nulo) -> último -> nulo
+            out[col] = pd.Categorical.from_codes(col_codes[codes], col_cats)
+        return pd.DataFrame(out, index=values.index)
+
+    def chapter_names(self, values: pd.Series, missing: str = "no data") -> pd.Series:
+        """Nombre de capítulo por fila ('missing' si no se puede mapear)."""
+        names = self.resolve(values)["ata_chapter_name"]
+        if missing not in names.cat.categories:
+            names = names.cat.add_categories([missing])
+        return names.fillna(missing)
+
+
+@lru_cache(maxsize=None)
+def get_ata_index(json_path: str = str(ATA_JSON_PATH)) -> AtaIndex:
+    """Índice ATA cacheado a nivel de módulo (vacío si no existe el JSON)."""
+    path = Path(json_path)
+    if not path.exists():
+        print(f"[WARN] No se encontró {path}. No se podrá mapear ATA → nombre.")
+        return AtaIndex([])
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    items = data.get("ata_chapters", data) if isinstance(data, dict) else data  # lista o dict con "ata_chapters"
+    return AtaIndex(items)
@@ -1,13 +1,235 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 import streamlit as st
 
-def get_local_csv_data():
-    #Data loading
-    df = pd.read_csv("src/data/llm_enhancement_aerlingus_defects_droppedna_19-9-2025.csv", sep = ';')
-    df['Date'] = pd.to_datetime(df['issue_date'])
+# Fuente de datos y carpeta de snapshots columnares (Parquet)
+DATA_PATH = Path("src/data/llm_enhancement_aerlingus_defects_droppedna_19-9-2025.csv")
+CACHE_DIR = Path("src/data/.cache")
+
+# Esquema declarado del dataset de findings:
+#   "category" -> columnas de baja cardinalidad
+#   "id"       -> identificadores, strings codificados por diccionario (category sin orden)
+#   "datetime" -> fechas, se parsean una única vez al construir el snapshot
+FINDINGS_SCHEMA = {
+    "ac_model": "category",
+    "aircraft_description": "category",
+    "finding_source": "category",
+    "location": "category",
+    "defect_category": "category",
+    "defect_specific_code": "category",
+    "ata_chapter_code": "category",
+    "ac_registration_id": "id",
+    "task_id": "id",
+    "amm_reference": "id",
+    "issue_date": "datetime",
+    "closing_date": "datetime",
+    "workstep_date": "datetime",
+}
+# El dataset se guarda ordenado por fecha (NaT al final): la posición de fila sigue el orden
+# temporal y una ventana de fechas es un tramo contiguo (ver src/filter_index.py)
+SORT_COLUMN = "Date"
+# Forma parte del nombre del snapshot: si cambia el esquema o el orden se regenera
+_SCHEMA_TAG = hashlib.sha1(json.dumps([FINDINGS_SCHEMA, SORT_COLUMN], sort_keys=True).encode()).hexdigest()[:8]
+
+
+def _file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _manifest_path(path: Path) -> Path:
+    return CACHE_DIR / f"{path.stem}.manifest.json"
+
+
+def _snapshot_path(path: Path, version: str) -> Path:
+    return CACHE_DIR / f"{path.stem}.{version[:16]}.{_SCHEMA_TAG}.parquet"
+
+
+def _read_manifest(path: Path) -> dict:
+    try:
+        with open(_manifest_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(path: Path, manifest: dict) -> None:
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = _manifest_path(path).with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, _manifest_path(path))
+    except OSError as e:
+        print(f"[WARN] No se pudo escribir el manifest de {path}: {e}")
+
+
+def get_source_version(path: Path = DATA_PATH) -> str:
+    """
+    Versión del CSV fuente (sha256 del contenido).
+    Sólo se recalcula el hash si cambian mtime o tamaño respecto al manifest,
+    así que en cada rerun el coste es un os.stat().
+    """
+    stat = path.stat()
+    manifest = _read_manifest(path)
+    if manifest.get("size") == stat.st_size and manifest.get("mtime_ns") == stat.st_mtime_ns:
+        return manifest["sha256"]
+
+    digest = _file_sha256(path)
+    if manifest.get("sha256") != digest:
+        manifest = {"sha256": digest}
+    # mismo contenido (p.ej. un touch): sólo actualizamos mtime/tamaño
+    manifest.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    _write_manifest(path, manifest)
+    return digest
+
+
+def _object_nbytes(col: pd.Series) -> int:
+    """Memoria que ocuparía la columna como strings 'object' (equivalente a memory_usage(deep=True))."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        cats = col.cat.categories
+        sizes = np.fromiter((sys.getsizeof(str(c)) for c in cats), dtype=np.int64, count=len(cats))
+        codes = col.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(cats))
+        # punteros + strings + NaN (float) por cada nulo
+        return int(8 * len(col) + counts @ sizes + (codes < 0).sum() * sys.getsizeof(np.nan))
+    return int(col.astype(object).memory_usage(deep=True, index=False))
+
+
+def memory_report(df: pd.DataFrame, raw_dtypes: dict) -> pd.DataFrame:
+    """Ahorro de memoria por columna del esquema tipado frente a la carga sin tipar."""
+    rows = []
+    for c in FINDINGS_SCHEMA:
+        if c not in df.columns:
+            continue
+        before = _object_nbytes(df[c]) if raw_dtypes.get(c) == "object" else int(df[c].memory_usage(deep=True, index=False))
+        after = int(df[c].memory_usage(deep=True, index=False))
+        rows.append({"column": c, "dtype_before": raw_dtypes.get(c), "dtype_after": str(df[c].dtype),
+                     "bytes_before": before, "bytes_after": after, "bytes_saved": before - after})
+    return pd.DataFrame(rows, columns=["column", "dtype_before", "dtype_after", "bytes_before", "bytes_after", "bytes_saved"])
+
+
+def _parse_csv(path: Path) -> tuple[pd.DataFrame, pd.DataFrame]:
+    dtypes = {c: "category" for c, kind in FINDINGS_SCHEMA.items() if kind in ("category", "id")}
+    df = pd.read_csv(path, sep=';', dtype=dtypes)
+    for c, kind in FINDINGS_SCHEMA.items():
+        if kind == "datetime" and c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+    # 'Date' comparte los datos de issue_date (sin segunda conversión)
+    df['Date'] = df['issue_date']
+    df = df.sort_values(SORT_COLUMN, kind="stable", na_position="last", ignore_index=True)
+
+    # Sin esquema, las columnas de texto y fechas se cargarían como 'object'
+    report = memory_report(df, {c: "object" for c in FINDINGS_SCHEMA})
+    saved = int(report["bytes_saved"].sum())
+    print(f"[INFO] Esquema tipado: {report['bytes_after'].sum() / 2**20:.1f} MB "
+          f"(ahorro {saved / 2**20:.1f} MB frente a columnas object)")
+    return df, report
+
+
+def _load_snapshot(path: Path, version: str) -> pd.DataFrame:
+    """Lee el snapshot Parquet de esta versión o, si no existe, parsea el CSV y lo escribe."""
+    snapshot = _snapshot_path(path, version)
+    if snapshot.exists():
+        try:
+            return pd.read_parquet(snapshot)
+        except Exception as e:
+            print(f"[WARN] Snapshot ilegible ({snapshot}), se regenera: {e}")
+
+    df, report = _parse_csv(path)
+    manifest = _read_manifest(path)
+    manifest["memory_report"] = report.to_dict(orient="records")
+    _write_manifest(path, manifest)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Borra snapshots de versiones anteriores del mismo CSV
+        for old in CACHE_DIR.glob(f"{path.stem}.*.parquet"):
+            old.unlink(missing_ok=True)
+        tmp = snapshot.with_suffix(".tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, snapshot)
+    except Exception as e:
+        # sin pyarrow o sin permisos seguimos con la copia en memoria
+        print(f"[WARN] No se pudo escribir el snapshot Parquet: {e}")
     return df
 
+
+class FindingsDataset:
+    """
+    Handle de sólo lectura sobre el dataset de findings compartido por todas las sesiones.
+    Nunca se entrega el frame original: 'df' y 'take' devuelven vistas copy-on-write (pandas >= 3),
+    así que las páginas pueden añadir columnas sin duplicar ni alterar los datos compartidos.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: str):
+        self._df = df
+        self.version = version
+        self._derived = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._df)
+
+    @property
+    def columns(self) -> pd.Index:
+        return self._df.columns
+
+    @property
+    def df(self) -> pd.DataFrame:
+        # copia superficial: mismo almacenamiento, objeto propio para el llamante
+        return self._df.copy(deep=False)
+
+    def take(self, rows) -> pd.DataFrame:
+        """Filas por posición (slice, máscara o array de posiciones) en una única selección."""
+        return self._df.iloc[rows]
+
+    def derived(self, name: str, builder):
+        """
+        Estructura derivada (índices, agregados...) construida una sola vez por versión
+        del dataset y compartida por todas las sesiones. 'builder' recibe el frame original
+        y no debe modificarlo.
+        """
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._derived:
+                self._derived[name] = builder(self._df)
+        return self._derived[name]
+
+
+@st.cache_resource(max_entries=1, show_spinner="Loading findings dataset...")
+def _shared_dataset(path: str, version: str) -> FindingsDataset:
+    # Una única copia por proceso, compartida por todas las sesiones.
+    # 'version' forma parte de la clave: si cambia el CSV se recarga.
+    return FindingsDataset(_load_snapshot(Path(path), version), version)
+
+
+def get_dataset() -> FindingsDataset:
+    """Dataset compartido (sólo lectura) de la versión actual del CSV."""
+    return _shared_dataset(str(DATA_PATH), get_source_version(DATA_PATH))
+
+
+def get_memory_report(path: Path = DATA_PATH) -> pd.DataFrame:
+    """Informe de memoria guardado al construir el snapshot actual (vacío si aún no existe)."""
+    records = _read_manifest(path).get("memory_report", [])
+    return pd.DataFrame(records)
+
+
+def get_local_csv_data():
+    #Data loading (snapshot Parquet + caché en memoria, invalidados por cambios en el CSV)
+    return get_dataset().df
+
 def enhance_dataframe(df):
     df['ac_model'] = np.random.choice(["A333", "A320", "A21N", "A332", "A20N", "A321", "A319"], 12)
     df['ac_description'] = np.random.choice(["AIRBUS A320-214", "AIRBUS A320-251N", "AIRBUS A330-302", "AIRBUS A330-200"], 12)
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from src.data_load import FindingsDataset
+from src.filter_index import FilterCache, cached_filter_rows, filter_key, get_index
+
+# Facetas calculadas, compartidas entre sesiones (mismo LRU que los filtros)
+FACET_CACHE = FilterCache(maxsize=512)
+
+
+def facet_counts(dataset: FindingsDataset, col: str, selections: dict, start=None, end=None) -> pd.Series:
+    """
+    Valores distintos de 'col' con su número de findings bajo la ventana de fechas y el
+    RESTO de filtros activos (el de la propia columna no se aplica, para poder ampliar
+    la selección). Un único bincount sobre los códigos de categoría; orden por count desc.
+    """
+    others = {c: v for c, v in selections.items() if c != col}
+    key = ("facet", col) + filter_key(dataset, others, start, end)
+
+    def _compute() -> pd.Series:
+        index = get_index(dataset, col)
+        rows = cached_filter_rows(dataset, others, start, end)
+        counts = np.bincount(index.codes[rows], minlength=len(index.categories) + 1)[1:]   # sin nulos
+        out = pd.Series(counts, index=index.categories, name="count")
+        out = out[out > 0]
+        return out.iloc[np.lexsort((out.index.astype(str), -out.to_numpy()))]
+
+    return FACET_CACHE.get_or_compute(key, _compute)
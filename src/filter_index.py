@@ -0,0 +1,234 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.data_load import FindingsDataset
+
+
+class InvertedIndex:
+    """
+    Índice invertido de una columna: valor -> posiciones de fila (ordenadas).
+    Se construye una vez por versión del dataset con un argsort estable de los
+    códigos de categoría; cada posting list es un tramo contiguo de ese orden.
+    """
+
+    def __init__(self, col: pd.Series):
+        if not isinstance(col.dtype, pd.CategoricalDtype):
+            col = col.astype("category")
+        self.categories = col.cat.categories
+        codes = col.cat.codes.to_numpy().astype(np.int64) + 1   # 0 = nulos
+        dtype = np.int32 if len(col) < 2**31 else np.int64
+        self.codes = codes.astype(np.int32 if len(self.categories) < 2**31 - 1 else np.int64)
+        self._order = np.argsort(codes, kind="stable").astype(dtype)
+        counts = np.bincount(codes, minlength=len(self.categories) + 1)
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def slots(self, values) -> np.ndarray:
+        """Códigos (0 = nulo, i + 1 = categories[i]) de los valores conocidos de 'values'."""
+        values = list(values)
+        slots = self.categories.get_indexer([v for v in values if not pd.isna(v)]) + 1
+        slots = np.unique(slots[slots > 0])
+        if any(pd.isna(v) for v in values):
+            slots = np.concatenate([[0], slots])
+        return slots
+
+    def postings(self, values) -> np.ndarray:
+        """Posiciones (ordenadas) de las filas cuyo valor está en 'values' (como isin)."""
+        slots = self.slots(values)
+        parts = [self._order[self._offsets[s]:self._offsets[s + 1]] for s in slots]
+        if not parts:
+            return self._order[:0]
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts))
+
+
+def intersect_sorted(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Intersección de dos arrays ordenados sin duplicados: O(len(pequeño) · log(len(grande)))."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return a
+    pos = np.searchsorted(b, a)
+    pos[pos == len(b)] = 0
+    return a[b[pos] == a]
+
+
+# Día "sin fecha": mayor que cualquier día real, igual que NaT queda al final del dataset
+NO_DAY = np.iinfo(np.int64).max
+
+
+def to_day_numbers(dates) -> np.ndarray:
+    """Fechas -> número de día desde 1970-01-01 (int64); NaT -> NO_DAY."""
+    values = np.asarray(dates, dtype="datetime64[ns]").astype("datetime64[D]")
+    days = values.astype(np.int64)
+    days[np.isnat(values)] = NO_DAY
+    return days
+
+
+class DayIndex:
+    """Número de día de cada fila del dataset (ordenado por fecha) para ventanas por searchsorted."""
+
+    def __init__(self, dates: pd.Series):
+        self.days = to_day_numbers(pd.to_datetime(dates, errors="coerce"))
+        self.is_sorted = bool(np.all(self.days[1:] >= self.days[:-1]))
+
+    def window(self, start, end) -> tuple[int, int]:
+        """Tramo [lo, hi) de filas con fecha entre start y end (ambos días incluidos)."""
+        first, last = to_day_numbers([pd.Timestamp(start), pd.Timestamp(end)])
+        lo, hi = np.searchsorted(self.days, [first, last + 1])
+        return int(lo), int(hi)
+
+
+def get_day_index(dataset: FindingsDataset) -> DayIndex:
+    return dataset.derived("day_index", lambda df: DayIndex(df["Date"]))
+
+
+def get_index(dataset: FindingsDataset, col: str) -> InvertedIndex:
+    return dataset.derived(f"inverted_index:{col}", lambda df: InvertedIndex(df[col]))
+
+
+def filter_rows(dataset: FindingsDataset, selections: dict, start=None, end=None) -> slice | np.ndarray:
+    """
+    Filas que cumplen la ventana de fechas [start, end] y todos los filtros {columna: valores}.
+    Sin filtros de columna el resultado es un slice (vista, sin copia); si no, posiciones ordenadas.
+    """
+    lo, hi = 0, len(dataset)
+    if start is not None and "Date" in dataset.columns:
+        day_index = get_day_index(dataset)
+        if day_index.is_sorted:
+            lo, hi = day_index.window(start, end)
+        else:
+            # frame sin ordenar por fecha (no pasa con get_dataset): máscara completa
+            first, last = to_day_numbers([pd.Timestamp(start), pd.Timestamp(end)])
+            in_window = np.flatnonzero((day_index.days >= first) & (day_index.days <= last))
+            return _intersect_all([in_window] + _postings(dataset, selections))
+
+    postings = _postings(dataset, selections)
+    if not postings:
+        return slice(lo, hi)
+    rows = _intersect_all(postings)
+    # Las posiciones siguen el orden por fecha: la ventana recorta cada extremo por búsqueda binaria
+    return rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+
+
+def group_rows(dataset: FindingsDataset, col: str, value, within: slice | np.ndarray) -> np.ndarray:
+    """
+    Posiciones (ordenadas) de las filas con col == value dentro de un resultado de
+    filter_rows: la posting list del grupo recortada a la ventana o intersecada con las filas.
+    """
+    rows = get_index(dataset, col).postings([value])
+    if isinstance(within, slice):
+        lo = 0 if within.start is None else within.start
+        hi = len(dataset) if within.stop is None else within.stop
+        return rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+    return intersect_sorted(rows, within)
+
+
+def _postings(dataset: FindingsDataset, selections: dict) -> list:
+    return [get_index(dataset, col).postings(vals)
+            for col, vals in selections.items() if vals and col in dataset.columns]
+
+
+def _intersect_all(postings: list) -> np.ndarray:
+    postings = sorted(postings, key=len)
+    rows = postings[0]
+    for p in postings[1:]:
+        if len(rows) == 0:
+            break
+        rows = intersect_sorted(rows, p)
+    return rows
+
+
+def _nbytes(value) -> int:
+    """Memoria de un resultado cacheado (arrays, Series y DataFrames; 0 si no se sabe medir)."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return int(np.sum(value.memory_usage(index=True)))
+    return 0
+
+
+class FilterCache:
+    """
+    LRU acotado de resultados de filtrado (posiciones de fila, no frames), compartido
+    por todas las páginas y sesiones del proceso. Lleva contadores de aciertos/fallos.
+    Se acota por nº de entradas y, con 'max_bytes', también por memoria total.
+    """
+
+    def __init__(self, maxsize: int = 256, max_bytes: int = None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # clave -> (resultado, bytes)
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute, cacheable=None):
+        """Resultado de la clave; 'cacheable(resultado)' False = se devuelve sin guardarlo."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        rows = compute()
+        if isinstance(rows, np.ndarray):
+            rows.flags.writeable = False   # compartido entre sesiones
+        size = _nbytes(rows)
+        if (cacheable is not None and not cacheable(rows)) or (self.max_bytes is not None and size > self.max_bytes):
+            return rows
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries[key][1]
+            self._entries[key] = (rows, size)
+            self._entries.move_to_end(key)
+            self.nbytes += size
+            while len(self._entries) > self.maxsize or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+        return rows
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._entries), "maxsize": self.maxsize, "nbytes": self.nbytes,
+                    "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+
+# Posiciones int64: el total se acota en bytes, no sólo en nº de entradas
+FILTER_CACHE = FilterCache(maxsize=256, max_bytes=64 * 2**20)
+# Selecciones de más de esta fracción del dataset no se cachean (dominarían el presupuesto)
+NEAR_FULL_FRACTION = 0.5
+
+
+def _canonical_value(v) -> str:
+    return "<NA>" if pd.isna(v) else str(v)
+
+
+def filter_key(dataset: FindingsDataset, selections: dict, start=None, end=None) -> tuple:
+    """Clave canónica: versión + ventana (días ISO) + valores seleccionados ordenados por columna."""
+    window = None
+    if start is not None:
+        window = tuple(sorted(pd.Timestamp(d).date().isoformat() for d in (start, end)))
+    active = tuple(sorted(
+        (col, tuple(sorted({_canonical_value(v) for v in vals})))
+        for col, vals in selections.items() if vals and col in dataset.columns
+    ))
+    return (dataset.version, window, active)
+
+
+def cached_filter_rows(dataset: FindingsDataset, selections: dict, start=None, end=None) -> slice | np.ndarray:
+    """
+    filter_rows servido desde FILTER_CACHE. Los slices (sin filtros de columna) y las
+    selecciones casi completas no se guardan: rehacerlos cuesta poco y ocuparían mucho.
+    """
+    key = filter_key(dataset, selections, start, end)
+    return FILTER_CACHE.get_or_compute(
+        key, lambda: filter_rows(dataset, selections, start, end),
+        cacheable=lambda rows: isinstance(rows, np.ndarray) and len(rows) <= NEAR_FULL_FRACTION * len(dataset),
+    )
@@ -0,0 +1,145 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from src.data_load import FindingsDataset
+from src.filter_index import FilterCache, filter_key, get_index
+from src.rollups import get_count_rollup, top_k
+
+# Top-k calculados, compartidos entre sesiones (mismo LRU que filtros y facetas)
+TOP_K_CACHE = FilterCache(maxsize=256)
+
+
+# -------------------- Modo exacto: conteos diarios del rollup --------------------
+def top_values(dataset: FindingsDataset, col: str, selections: dict, start, end, k: int = 10) -> pd.Series:
+    """
+    Top-k exacto de 'col' (valores no nulos) en la ventana y con los filtros dados: se
+    suman los conteos por día del rollup (día x filtros x 'col') y se eligen los k mayores
+    por selección parcial. Orden por count desc.
+    """
+    key = ("top_k", col, k) + filter_key(dataset, selections, start, end)
+
+    def _compute() -> pd.Series:
+        dims = [c for c in selections if c in dataset.columns and c != col] + [col]
+        rollup = get_count_rollup(dataset, dims)
+        slots = {c: get_index(dataset, c).slots(vals) if vals else None
+                 for c, vals in selections.items() if c in dims}
+        counts = rollup.value_counts(start, end, slots, col)
+        counts[0] = 0   # nulos fuera, como value_counts
+        top = top_k(counts, k)
+        return pd.Series(counts[top], index=get_index(dataset, col).categories[top - 1], name="count")
+
+    return TOP_K_CACHE.get_or_compute(key, _compute)
+
+
+# -------------------- Modo aproximado (memoria acotada, ingesta en streaming) --------------------
+class SpaceSaving:
+    """
+    Space-Saving con 'capacity' contadores: cada valor seguido tiene count >= real y
+    count - error <= real. Un valor nuevo con la tabla llena sustituye al contador mínimo.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counters = {}   # valor -> [count, error]
+        self._heap = []      # (count, orden, valor); las entradas obsoletas se descartan al sacar o compactar
+        self._seq = 0        # desempate del heap sin comparar valores
+        self.total = 0
+
+    def _pop_min(self):
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if item in self.counters and self.counters[item][0] == count:
+                return count, item
+
+    def _compact(self) -> None:
+        """Rehace el heap sólo con los contadores vivos (memoria O(capacity))."""
+        self._heap = [(c[0], seq, item) for seq, (item, c) in enumerate(self.counters.items(), self._seq)]
+        self._seq += len(self._heap)
+        heapq.heapify(self._heap)
+
+    def update(self, items, counts=None) -> None:
+        """Añade un lote (se agrega primero: una actualización por valor distinto)."""
+        batch = pd.Series(np.ones(len(items), dtype=np.int64) if counts is None else counts,
+                          index=pd.Index(items))
+        batch = batch.groupby(level=0, sort=False).sum().sort_values(ascending=False)
+        for item, count in zip(batch.index, batch.to_numpy()):
+            count = int(count)
+            self.total += count
+            if item in self.counters:
+                self.counters[item][0] += count
+            elif len(self.counters) < self.capacity:
+                self.counters[item] = [count, 0]
+            else:
+                low, evicted = self._pop_min()
+                del self.counters[evicted]
+                self.counters[item] = [low + count, low]
+            self._seq += 1
+            heapq.heappush(self._heap, (self.counters[item][0], self._seq, item))
+            if len(self._heap) > 2 * self.capacity:
+                self._compact()
+
+    def top(self, k: int) -> pd.DataFrame:
+        """Los k valores con mayor count estimado, con su error máximo."""
+        out = pd.DataFrame.from_dict(self.counters, orient="index", columns=["count", "error"])
+        return out.sort_values("count", ascending=False, kind="stable").head(k)
+
+
+class CountMinSketch:
+    """Count-min de 'depth' filas x 'width' columnas sobre hashes de 64 bits: estimación >= real."""
+
+    def __init__(self, width: int = 2**14, depth: int = 4, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.width, self.depth = width, depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._mult = rng.integers(1, 2**63, size=depth, dtype=np.uint64) | np.uint64(1)
+
+    def _slots(self, items) -> np.ndarray:
+        h = pd.util.hash_array(np.asarray(items, dtype=object))
+        with np.errstate(over="ignore"):   # multiply-shift: el desbordamiento es parte del hash
+            mixed = h[None, :] * self._mult[:, None]
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.int64)
+
+    def add(self, items, counts) -> None:
+        slots = self._slots(items)
+        for row in range(self.depth):
+            np.add.at(self.table[row], slots[row], np.asarray(counts, dtype=np.int64))
+
+    def estimate(self, items) -> np.ndarray:
+        slots = self._slots(items)
+        return self.table[np.arange(self.depth)[:, None], slots].min(axis=0)
+
+
+class StreamingTopK:
+    """
+    Top-k aproximado por columna para ingesta por lotes sin guardar filas: Space-Saving
+    da los candidatos y count-min acota su count (se usa el menor de los dos).
+    """
+
+    def __init__(self, columns, capacity: int = 1000, width: int = 2**14, depth: int = 4):
+        self.columns = list(columns)
+        self._summaries = {c: SpaceSaving(capacity) for c in self.columns}
+        self._sketches = {c: CountMinSketch(width, depth) for c in self.columns}
+
+    def ingest(self, chunk: pd.DataFrame) -> None:
+        for col in self.columns:
+            counts = chunk[col].value_counts()
+            counts = counts[counts > 0]
+            self._summaries[col].update(list(counts.index), counts.to_numpy())
+            self._sketches[col].add(list(counts.index), counts.to_numpy())
+
+    def top(self, col: str, k: int = 10) -> pd.Series:
+        candidates = self._summaries[col].top(self._summaries[col].capacity)
+        estimate = np.minimum(candidates["count"].to_numpy(),
+                              self._sketches[col].estimate(list(candidates.index)))
+        out = pd.Series(estimate, index=candidates.index, name="count")
+        return out.sort_values(ascending=False, kind="stable").head(k)
+
+
+def stream_csv_top_k(path, columns, k: int = 10, chunksize: int = 100_000, capacity: int = 1000) -> dict:
+    """Top-k aproximado de un CSV leído por bloques (memoria acotada por 'capacity', no por filas)."""
+    stream = StreamingTopK(columns, capacity=capacity)
+    for chunk in pd.read_csv(path, sep=';', usecols=list(columns), chunksize=chunksize):
+        stream.ingest(chunk)
+    return {col: stream.top(col, k) for col in columns}
@@ -0,0 +1,230 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data_load import CACHE_DIR, FindingsDataset
+from src.text_clusters import (FEATURES_TAG, N_FEATURES, TEXT_COLUMNS, MiniBatchKMeans, TextFeatures,
+                               cluster_findings, documents, get_text_features, vectorize)
+
+# Modelo global persistido, uno por nº de clusters (no depende de la versión: se actualiza
+# al crecer el dataset). Cambiar k en la página no re-ajusta ni pisa el modelo de otro k.
+MODEL_DIR = CACHE_DIR
+# Registro de actualizaciones (una línea JSON por actualización: latencia, drift, re-ajuste)
+LOG_PATH = CACHE_DIR / "cluster_model.log.jsonl"
+
+# Columnas que identifican un finding: una fila nueva es una clave que el modelo no ha visto
+ROW_KEY_COLUMNS = ["work_order_id", "task_id", "ac_registration_id", "issue_date"] + TEXT_COLUMNS
+
+# Umbrales de drift (acumulado desde el último ajuste) a partir de los que se re-ajusta
+DRIFT_THRESHOLDS = {
+    "similarity_drop": 0.05,      # caída de la similitud media con el centroide asignado
+    "distribution_shift": 0.15,   # distancia de variación total entre repartos por cluster
+    "oov_rate": 0.20,             # tokens en columnas de hashing que no existían al ajustar
+}
+# Por debajo de estas filas nuevas el drift es ruido y no dispara re-ajustes
+MIN_DRIFT_ROWS = 500
+
+
+def model_path(n_clusters: int) -> Path:
+    return MODEL_DIR / f"cluster_model.k{n_clusters}.npz"
+
+
+def row_keys(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash (uint64) de las columnas identificativas de cada fila. Se hashea el texto de cada
+    valor: la clave no cambia si entre versiones cambia el dtype inferido de una columna.
+    """
+    cols = [c for c in ROW_KEY_COLUMNS if c in df.columns]
+    return pd.util.hash_pandas_object(df[cols].astype("string"), index=False).to_numpy()
+
+
+class IncrementalClusters:
+    """
+    Centroides + estado del vocabulario (idf y columnas de hashing conocidas) de un ajuste
+    completo, y la asignación de cada finding visto (por clave de fila, ordenadas).
+    Las filas nuevas se asignan por lotes vectorizados al centroide más cercano; el drift
+    se acumula desde el último ajuste y decide cuándo re-ajustar.
+    """
+
+    def __init__(self, centers, idf, known, keys, labels, similarity, baseline: dict, pending: dict):
+        self.centers = centers
+        self.idf = idf
+        self.known = known
+        self.keys = keys
+        self.labels = labels
+        self.similarity = similarity
+        self.baseline = baseline
+        self.pending = pending
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.centers)
+
+    @staticmethod
+    def _empty_pending(n_clusters: int) -> dict:
+        return {"rows": 0, "similarity_sum": 0.0, "counts": np.zeros(n_clusters, dtype=np.int64),
+                "tokens": 0, "oov_tokens": 0}
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, features: TextFeatures, n_clusters: int = 10, seed: int = 0) -> "IncrementalClusters":
+        """Ajuste completo sobre todas las filas de 'df' (las de 'features')."""
+        result = cluster_findings(features, np.arange(len(features)), n_clusters, seed)
+        keys, first = np.unique(row_keys(df), return_index=True)
+        centers = result.model.centers
+        if centers is None:   # sin texto en ninguna fila
+            centers = np.zeros((1, N_FEATURES), dtype=np.float32)
+        with_text = result.labels >= 0
+        baseline = {
+            "similarity": float(result.similarity[with_text].mean()) if with_text.any() else 0.0,
+            "shares": np.bincount(result.labels[with_text], minlength=len(centers)) / max(with_text.sum(), 1),
+        }
+        known = np.bincount(features.matrix.indices, minlength=N_FEATURES) > 0
+        return cls(centers, features.idf, known, keys, result.labels[first], result.similarity[first],
+                   baseline, cls._empty_pending(len(centers)))
+
+    def model(self) -> MiniBatchKMeans:
+        model = MiniBatchKMeans(n_clusters=self.n_clusters)
+        model.centers = self.centers
+        return model
+
+    def assign(self, docs: pd.Series, batch_size: int = 50_000) -> tuple[np.ndarray, np.ndarray, int, int]:
+        """(cluster, similitud, tokens, tokens fuera de vocabulario) de textos nuevos, por lotes."""
+        labels = np.empty(len(docs), dtype=np.int64)
+        similarity = np.empty(len(docs), dtype=np.float32)
+        tokens = oov = 0
+        for lo in range(0, len(docs), batch_size):
+            X, buckets = vectorize(docs.iloc[lo:lo + batch_size], self.idf)
+            batch_labels, batch_similarity = self.model().predict(X)
+            labels[lo:lo + batch_size], similarity[lo:lo + batch_size] = batch_labels, batch_similarity
+            tokens += len(buckets)
+            oov += int((~self.known[buckets]).sum())
+        return labels, similarity, tokens, oov
+
+    def drift(self) -> dict:
+        """Métricas de drift de las filas asignadas desde el último ajuste."""
+        p = self.pending
+        with_text = int(p["counts"].sum())
+        if with_text == 0:
+            return {"similarity_drop": 0.0, "distribution_shift": 0.0, "oov_rate": 0.0}
+        shares = p["counts"] / with_text
+        return {
+            "similarity_drop": self.baseline["similarity"] - p["similarity_sum"] / with_text,
+            "distribution_shift": 0.5 * float(np.abs(shares - self.baseline["shares"]).sum()),
+            "oov_rate": p["oov_tokens"] / max(p["tokens"], 1),
+        }
+
+    def needs_refit(self) -> bool:
+        if self.pending["rows"] < MIN_DRIFT_ROWS:
+            return False
+        return any(value > DRIFT_THRESHOLDS[name] for name, value in self.drift().items())
+
+    def update(self, df: pd.DataFrame) -> dict:
+        """
+        Asigna las filas de 'df' que el modelo no ha visto y olvida las que ya no están.
+        Devuelve la entrada de registro (filas nuevas, latencia, drift, si hay que re-ajustar).
+        """
+        keys = row_keys(df)
+        pos = np.clip(np.searchsorted(self.keys, keys), 0, max(len(self.keys) - 1, 0))
+        seen = (self.keys[pos] == keys) if len(self.keys) else np.zeros(len(keys), dtype=bool)
+        new_keys, first = np.unique(keys[~seen], return_index=True)
+        new_rows = np.flatnonzero(~seen)[first]
+
+        start = time.perf_counter()
+        labels, similarity, tokens, oov = self.assign(documents(df.iloc[new_rows]))
+        latency = time.perf_counter() - start
+
+        with_text = labels >= 0
+        self.pending["rows"] += len(new_rows)
+        self.pending["similarity_sum"] += float(similarity[with_text].sum())
+        self.pending["counts"] += np.bincount(labels[with_text], minlength=self.n_clusters)
+        self.pending["tokens"] += tokens
+        self.pending["oov_tokens"] += oov
+
+        # claves vigentes: las vistas que siguen en el dataset + las nuevas
+        current = np.isin(self.keys, keys)
+        merged_keys = np.concatenate([self.keys[current], new_keys])
+        order = np.argsort(merged_keys, kind="stable")
+        self.keys = merged_keys[order]
+        self.labels = np.concatenate([self.labels[current], labels])[order]
+        self.similarity = np.concatenate([self.similarity[current], similarity])[order]
+
+        return {"time": pd.Timestamp.now().isoformat(timespec="seconds"), "rows": len(df),
+                "new_rows": len(new_rows), "latency_ms": round(1000 * latency, 3),
+                "ms_per_1k_rows": round(1e6 * latency / max(len(new_rows), 1), 3),
+                **{k: round(float(v), 4) for k, v in self.drift().items()},
+                "refit": self.needs_refit()}
+
+    def lookup(self, df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """(cluster, similitud) de las filas de 'df'; KeyError si alguna no ha pasado por update."""
+        keys = row_keys(df)
+        pos = np.clip(np.searchsorted(self.keys, keys), 0, max(len(self.keys) - 1, 0))
+        seen = (self.keys[pos] == keys) if len(self.keys) else np.zeros(len(keys), dtype=bool)
+        if not seen.all():
+            raise KeyError(f"{int((~seen).sum())} filas sin asignar: pasa el dataset por update() antes de lookup()")
+        return self.labels[pos], self.similarity[pos]
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, centers=self.centers, idf=self.idf, known=self.known, keys=self.keys,
+                     labels=self.labels, similarity=self.similarity,
+                     baseline_similarity=self.baseline["similarity"], baseline_shares=self.baseline["shares"],
+                     pending_counts=self.pending["counts"], features_tag=FEATURES_TAG,
+                     pending=json.dumps({k: v for k, v in self.pending.items() if k != "counts"}))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IncrementalClusters":
+        """Estado guardado; KeyError si se guardó con otra configuración de features."""
+        data = np.load(path)
+        if str(data["features_tag"]) != FEATURES_TAG:
+            raise KeyError("features_tag")
+        pending = json.loads(str(data["pending"]))
+        pending["counts"] = data["pending_counts"]
+        baseline = {"similarity": float(data["baseline_similarity"]), "shares": data["baseline_shares"]}
+        return cls(data["centers"], data["idf"], data["known"], data["keys"], data["labels"],
+                   data["similarity"], baseline, pending)
+
+
+def _append_log(entry: dict, path: Path = LOG_PATH) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        print(f"[WARN] No se pudo escribir el registro de clusters: {e}")
+
+
+def get_incremental_clusters(dataset: FindingsDataset, n_clusters: int = 10) -> IncrementalClusters:
+    """
+    Modelo global para la versión actual: se carga de disco, se asignan sólo las filas
+    nuevas y se re-ajusta completo únicamente si el drift supera DRIFT_THRESHOLDS
+    (o si no hay modelo guardado para este nº de clusters).
+    """
+    path = model_path(n_clusters)
+
+    def _build(df: pd.DataFrame) -> IncrementalClusters:
+        state = None
+        if path.exists():
+            try:
+                state = IncrementalClusters.load(path)
+            except Exception as e:
+                print(f"[WARN] Modelo de clusters no reutilizable, se re-ajusta: {e}")
+        if state is not None and state.n_clusters == n_clusters:
+            entry = state.update(df)
+        else:
+            entry = {"time": pd.Timestamp.now().isoformat(timespec="seconds"), "rows": len(df), "refit": True}
+        if entry["refit"]:
+            state = IncrementalClusters.fit(df, get_text_features(dataset), n_clusters)
+        _append_log({"version": dataset.version[:16], "n_clusters": n_clusters, **entry})
+        try:
+            state.save(path)
+        except OSError as e:
+            print(f"[WARN] No se pudo guardar el modelo de clusters: {e}")
+        return state
+    return dataset.derived(f"incremental_clusters:{n_clusters}", _build)
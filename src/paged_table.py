@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from src.filter_index import FilterCache
+
+# Órdenes calculados (posiciones), compartidos entre sesiones con la misma selección
+SORT_CACHE = FilterCache(maxsize=64)
+
+
+def sort_keys(col: pd.Series) -> np.ndarray:
+    """Clave int64 de orden ascendente de una columna (rango del valor); nulos -> -1."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # rango de cada categoría según su valor, no según el orden de aparición
+        rank = np.empty(len(col.cat.categories), dtype=np.int64)
+        rank[np.argsort(col.cat.categories.to_numpy(), kind="stable")] = np.arange(len(rank))
+        codes = col.cat.codes.to_numpy()
+        return np.where(codes >= 0, rank[codes], -1)
+    try:
+        codes, _ = pd.factorize(col, sort=True)
+    except TypeError:   # tipos mezclados: se ordena por su texto
+        codes, _ = pd.factorize(col.astype("string"), sort=True)
+    return codes.astype(np.int64)
+
+
+def sort_order(df: pd.DataFrame, col: str, ascending: bool = True) -> np.ndarray:
+    """Posiciones de fila ordenadas por 'col' (estable, nulos al final en ambos sentidos)."""
+    keys = sort_keys(df[col])
+    top = keys.max(initial=0) + 1
+    keys = np.where(keys < 0, top, keys if ascending else top - 1 - keys)
+    return np.argsort(keys, kind="stable")
+
+
+def table_page(df: pd.DataFrame, columns: list, sort_by: str | None, ascending: bool,
+               page: int, page_size: int, cache_key=None) -> pd.DataFrame:
+    """
+    Página 'page' (desde 0) de 'df' ordenado por 'sort_by', sólo con 'columns': el orden
+    son posiciones y sólo se extraen las filas de la página. Con 'cache_key' (que debe
+    identificar el contenido de 'df') el orden se reutiliza entre reruns y sesiones.
+    """
+    lo, hi = page * page_size, min((page + 1) * page_size, len(df))
+    if sort_by is None:
+        positions = np.arange(lo, max(lo, hi))
+    else:
+        if cache_key is None:
+            order = sort_order(df, sort_by, ascending)
+        else:
+            order = SORT_CACHE.get_or_compute(
+                ("sort", sort_by, ascending, cache_key), lambda: sort_order(df, sort_by, ascending))
+        positions = order[lo:hi]
+    return df.iloc[positions, df.columns.get_indexer(columns)]
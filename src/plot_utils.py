@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from plotly import graph_objects as go
+
+# Máximo de puntos por serie que se envían al navegador sin reducir
+POINT_BUDGET = 1000
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: índices de 'n_out' puntos que conservan la forma de la
+    serie (picos y valles). Primer y último punto fijos; en cada bucket se elige el punto
+    que forma el triángulo de mayor área con el anterior elegido y la media del siguiente.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)   # n_out - 2 buckets interiores
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            avg_x, avg_y = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def timeseries_trace(series: pd.Series, budget: int = POINT_BUDGET, **kwargs) -> tuple[go.Scatter, bool]:
+    """
+    Traza de una serie temporal: tal cual por debajo de 'budget' puntos; por encima,
+    Scattergl (WebGL) con LTTB a 'budget' puntos. Devuelve (traza, si se redujo).
+    """
+    x = series.index
+    if len(series) <= budget:
+        return go.Scatter(x=x, y=series.to_numpy(), **kwargs), False
+    x_num = x.asi8 if isinstance(x, pd.DatetimeIndex) else np.asarray(x, dtype=float)
+    keep = lttb_indices(x_num, series.to_numpy(), budget)
+    return go.Scattergl(x=x[keep], y=series.to_numpy()[keep], **kwargs), True
@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+
+from src.data_load import FindingsDataset
+from src.filter_index import NO_DAY, cached_filter_rows, get_day_index, get_index, to_day_numbers
+
+# Granularidades derivadas de los bins diarios
+FREQ_LABELS = {"D": "Day", "W": "Week", "M": "Month"}
+
+# Sólo columnas con pocos valores entran en el rollup de la línea temporal: con task_id o la
+# matrícula el grano es casi una fila por finding y recorrerlo no ahorra nada frente a las filas
+ROLLUP_MAX_CARDINALITY = 50
+
+# Dimensiones del cubo de Volume Analysis (cualquier par se responde desde el mismo rollup)
+VOLUME_DIMENSIONS = ["ac_model", "location", "ata_chapter_code", "ac_registration_id"]
+
+
+class CountRollup:
+    """
+    Nº de findings por día y combinación de dimensiones de filtro, con los códigos del
+    índice invertido de cada columna (0 = nulo). Además de la tabla de grano completo
+    (ordenada por día) guarda dos agregados más baratos:
+      - totales por día (sin filtros),
+      - por dimensión: (código, día) -> count, para consultas con un único filtro activo.
+    Con varios filtros se recorren sólo las filas de grano de la ventana.
+    """
+
+    def __init__(self, days: np.ndarray, codes: dict):
+        self.dimensions = list(codes)
+        self.days, day_idx = np.unique(days, return_inverse=True)   # días con datos (NO_DAY al final)
+        day_idx = day_idx.ravel()
+        n_days = len(self.days)
+        self.totals = np.bincount(day_idx, minlength=n_days)
+
+        # grano: (día, dim_1, ..., dim_k) únicos por lexsort (la última clave es la principal)
+        order = np.lexsort(tuple(codes[c] for c in reversed(self.dimensions)) + (day_idx,))
+        sorted_day = day_idx[order]
+        sorted_codes = {c: codes[c][order] for c in self.dimensions}
+        new_group = np.ones(len(order), dtype=bool)
+        new_group[1:] = sorted_day[1:] != sorted_day[:-1]
+        for c in self.dimensions:
+            new_group[1:] |= sorted_codes[c][1:] != sorted_codes[c][:-1]
+        starts = np.flatnonzero(new_group)
+        self.grain_day = sorted_day[starts]
+        self.grain_codes = {c: sorted_codes[c][starts] for c in self.dimensions}
+        self.grain_count = np.diff(np.append(starts, len(order)))
+
+        # marginales por dimensión: clave código * n_days + día, ordenadas
+        self._marginals = {}
+        for c in self.dimensions:
+            key, count = np.unique(codes[c].astype(np.int64) * n_days + day_idx, return_counts=True)
+            self._marginals[c] = (key, count)
+
+    def __len__(self) -> int:
+        return len(self.grain_day)
+
+    def _window(self, start, end) -> tuple[int, int]:
+        first, last = to_day_numbers([pd.Timestamp(start), pd.Timestamp(end)])
+        lo, hi = np.searchsorted(self.days, [first, last + 1])
+        return int(lo), int(hi)
+
+    def day_counts(self, start, end, slots: dict) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (días, counts) de la ventana [start, end] (días incluidos) para los filtros dados
+        como códigos por dimensión ({columna: slots}); sólo días con count > 0.
+        """
+        lo, hi = self._window(start, end)
+        n_days = len(self.days)
+        active = {c: s for c, s in slots.items() if s is not None}
+        if not active:
+            counts = self.totals[lo:hi]
+        elif len(active) == 1:
+            (col, col_slots), = active.items()
+            key, count = self._marginals[col]
+            counts = np.zeros(hi - lo, dtype=np.int64)
+            for s in col_slots:
+                a, b = np.searchsorted(key, [s * n_days + lo, s * n_days + hi])
+                counts += np.bincount(key[a:b] - s * n_days - lo, weights=count[a:b],
+                                      minlength=hi - lo).astype(np.int64)
+        else:
+            a, b = np.searchsorted(self.grain_day, [lo, hi])
+            mask = np.ones(b - a, dtype=bool)
+            for col, col_slots in active.items():
+                mask &= np.isin(self.grain_codes[col][a:b], col_slots)
+            counts = np.bincount(self.grain_day[a:b][mask] - lo, weights=self.grain_count[a:b][mask],
+                                 minlength=hi - lo).astype(np.int64)
+        keep = counts > 0
+        return self.days[lo:hi][keep], counts[keep]
+
+    def value_counts(self, start, end, slots: dict, target: str) -> np.ndarray:
+        """Counts por código de 'target' (índice 0 = nulo) en la ventana con los filtros dados."""
+        lo, hi = self._window(start, end)
+        n_values = int(self.grain_codes[target].max(initial=0)) + 1
+        active = {c: s for c, s in slots.items() if s is not None}
+        if not active:
+            # marginal (código, día) de la columna: sólo los días de la ventana
+            key, count = self._marginals[target]
+            day = key % len(self.days)
+            keep = (day >= lo) & (day < hi)
+            codes, weights = key[keep] // len(self.days), count[keep]
+        else:
+            a, b = np.searchsorted(self.grain_day, [lo, hi])
+            mask = np.ones(b - a, dtype=bool)
+            for col, col_slots in active.items():
+                mask &= np.isin(self.grain_codes[col][a:b], col_slots)
+            codes, weights = self.grain_codes[target][a:b][mask], self.grain_count[a:b][mask]
+        return np.bincount(codes, weights=weights, minlength=n_values).astype(np.int64)
+
+    def pair_counts(self, start, end, row: str, col: str) -> np.ndarray:
+        """
+        Cubo cortado a la ventana y sumado sobre el resto de dimensiones: matriz de counts
+        (códigos de 'row' x códigos de 'col', índice 0 = nulo). Con row == col, la diagonal.
+        """
+        lo, hi = self._window(start, end)
+        a, b = np.searchsorted(self.grain_day, [lo, hi])
+        n_row = int(self.grain_codes[row].max(initial=0)) + 1
+        n_col = int(self.grain_codes[col].max(initial=0)) + 1
+        cell = self.grain_codes[row][a:b].astype(np.int64) * n_col + self.grain_codes[col][a:b]
+        counts = np.bincount(cell, weights=self.grain_count[a:b], minlength=n_row * n_col)
+        return counts.astype(np.int64).reshape(n_row, n_col)
+
+    def series(self, start, end, slots: dict, freq: str = "D") -> pd.Series:
+        """Counts por periodo ('D', 'W' = semana desde el lunes, 'M'), índice = inicio del periodo."""
+        days, counts = self.day_counts(start, end, slots)
+        return resample_days(days, counts, freq)
+
+
+def resample_days(days: np.ndarray, counts: np.ndarray, freq: str) -> pd.Series:
+    """Re-agrega bins diarios (días desde 1970-01-01) a día/semana/mes: coste ~ nº de días."""
+    if freq == "W":
+        bucket = days - (days + 3) % 7   # 1970-01-01 fue jueves: +3 lleva el lunes a 0
+    elif freq == "M":
+        bucket = days.astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    else:
+        bucket = days
+    uniq, inv = np.unique(bucket, return_inverse=True)
+    sums = np.bincount(inv.ravel(), weights=counts, minlength=len(uniq)).astype(np.int64)
+    return pd.Series(sums, index=pd.DatetimeIndex(uniq.astype("datetime64[D]")), name="Count")
+
+
+def top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """Índices de los k mayores valores > 0 (selección parcial con argpartition), de mayor a menor."""
+    candidates = np.flatnonzero(values > 0)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-values[candidates], k - 1)[:k]]
+    return candidates[np.lexsort((candidates, -values[candidates]))]
+
+
+def get_count_rollup(dataset: FindingsDataset, dimensions) -> CountRollup:
+    """Rollup diario de la versión actual para las dimensiones dadas (una vez por versión)."""
+    dimensions = tuple(dimensions)
+
+    def _build(df: pd.DataFrame) -> CountRollup:
+        codes = {c: get_index(dataset, c).codes for c in dimensions}
+        return CountRollup(to_day_numbers(df["Date"]), codes)
+
+    return dataset.derived(f"count_rollup:{','.join(dimensions)}", _build)
+
+
+def rollup_series(dataset: FindingsDataset, selections: dict, start, end, freq: str = "D") -> pd.Series:
+    """
+    Serie de findings por periodo con los filtros 'selections' ({columna: valores}). Desde
+    el rollup de las columnas de pocos valores (coste ~ grano de la ventana); si hay un
+    filtro activo en otra columna, bincount por día de las filas filtradas (ya son pocas).
+    """
+    columns = [c for c in selections if c in dataset.columns]
+    low = [c for c in columns if len(get_index(dataset, c).categories) <= ROLLUP_MAX_CARDINALITY]
+    if any(selections[c] for c in columns if c not in low):
+        days = get_day_index(dataset).days[cached_filter_rows(dataset, selections, start, end)]
+        days, counts = np.unique(days[days != NO_DAY], return_counts=True)
+        return resample_days(days, counts, freq)
+    rollup = get_count_rollup(dataset, low)
+    slots = {c: get_index(dataset, c).slots(vals) if vals else None
+             for c, vals in selections.items() if c in rollup.dimensions}
+    return rollup.series(start, end, slots, freq)
+
+
+def pair_top_k(dataset: FindingsDataset, row: str, col: str, start, end, k: int = 10,
+               dimensions=VOLUME_DIMENSIONS) -> tuple[pd.Series, pd.DataFrame]:
+    """
+    Findings en la ventana por 'row' (top-k del marginal) y matriz top-k de 'row' x top-k
+    de 'col', desde el cubo. Los nulos no se cuentan como valor (como en un groupby); el
+    marginal de 'row' sí incluye las filas con 'col' nulo.
+    """
+    matrix = get_count_rollup(dataset, dimensions).pair_counts(start, end, row, col)
+    matrix[0, :] = 0
+    totals = matrix.sum(axis=1)
+    matrix[:, 0] = 0
+    row_labels = get_index(dataset, row).categories
+    col_labels = get_index(dataset, col).categories
+
+    top_rows, top_cols = top_k(totals, k), top_k(matrix.sum(axis=0), k)
+    marginal = pd.Series(totals[top_rows], index=row_labels[top_rows - 1], name="Findings")
+    heatmap = pd.DataFrame(matrix[np.ix_(top_rows, top_cols)],
+                           index=row_labels[top_rows - 1], columns=col_labels[top_cols - 1])
+    return marginal, heatmap
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from src.data_load import CACHE_DIR, FindingsDataset
+from src.text_clusters import (FEATURES_TAG, N_FEATURES, STOP_WORDS, TEXT_COLUMNS, TOKEN_PATTERN, TextFeatures,
+                               get_text_features, hash_tokens, vectorize)
+
+# Índice en disco (un directorio: se sustituye entero al cambiar la versión del dataset).
+# El agente SQL lo abre sin el dashboard (ver src/sql_agent/app/api/similar_findings.py):
+# meta.json lleva todo lo necesario para vectorizar una consulta igual que aquí.
+INDEX_DIR = CACHE_DIR / "similarity_index"
+
+# LSH por proyecciones aleatorias: N_TABLES tablas de n_bits hiperplanos cada una
+N_TABLES = 16
+SEED = 0
+# Formato en disco y tokens de la huella: el lector del agente tiene su propia copia del hashing
+# y de la proyección, y compara ambos con meta.json al abrir (un cambio aquí no pasa inadvertido)
+INDEX_FORMAT = 1
+FINGERPRINT_TOKENS = ["engine", "hydraulic", "leak", "fwd", "cargo", "door", "a320", "0"]
+# Columnas del finding más reciente de cada texto (lo que ve el agente de cada resultado)
+DOC_COLUMNS = ["work_order_id", "task_id", "ac_registration_id", "ac_model", "ata_chapter_code"] + TEXT_COLUMNS
+
+
+def projection(buckets: np.ndarray, n_planes: int, seed: int = SEED) -> np.ndarray:
+    """
+    Signo (+1/-1) de cada columna de hashing en cada hiperplano, calculado con splitmix64
+    sobre (columna, hiperplano): la matriz no se guarda y una consulta sólo calcula las
+    filas de sus columnas no nulas.
+    """
+    keys = (np.asarray(buckets, dtype=np.uint64)[:, None] * np.uint64(n_planes)
+            + np.arange(n_planes, dtype=np.uint64)[None, :])
+    with np.errstate(over="ignore"):   # aritmética módulo 2**64
+        h = keys + np.uint64(seed + 1) * np.uint64(0x9E3779B97F4A7C15)
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        h = h ^ (h >> np.uint64(31))
+    return np.where(h >> np.uint64(63), 1, -1).astype(np.float32)
+
+
+def signatures(margins: np.ndarray, n_tables: int, n_bits: int) -> np.ndarray:
+    """Clave (uint32) de cada tabla a partir de las proyecciones (filas x n_tables*n_bits)."""
+    bits = (margins.reshape(len(margins), n_tables, n_bits) > 0).astype(np.uint32)
+    return (bits << np.arange(n_bits, dtype=np.uint32)).sum(axis=2, dtype=np.uint32)
+
+
+def fingerprint(n_tables: int, n_bits: int, seed: int) -> str:
+    """Huella del hashing de tokens, la proyección y las claves LSH sobre FINGERPRINT_TOKENS."""
+    buckets = hash_tokens(np.asarray(FINGERPRINT_TOKENS, dtype=object))
+    weights = np.linspace(1, 2, len(buckets), dtype=np.float32)
+    keys = signatures((weights @ projection(buckets, n_tables * n_bits, seed))[None, :], n_tables, n_bits)[0]
+    return hashlib.sha256(buckets.tobytes() + keys.tobytes()).hexdigest()[:16]
+
+
+def bits_for(n_docs: int) -> int:
+    """Hiperplanos por tabla: cubetas de ~16 textos de media (más bits = menos candidatos y menos recall)."""
+    return int(np.clip(round(np.log2(max(n_docs, 1))) - 4, 8, 24))
+
+
+def _doc_table(df: pd.DataFrame, doc_of_row: np.ndarray) -> pa.Table:
+    """Por texto distinto: nº de findings, primera/última fecha y el finding más reciente."""
+    cols = [c for c in DOC_COLUMNS if c in df.columns]
+    # El dataset está ordenado por fecha: la última fila de cada texto es la más reciente
+    last = np.unique(doc_of_row[::-1], return_index=True)[1]
+    last = len(doc_of_row) - 1 - last
+    out = df.iloc[last][cols].astype("string").reset_index(drop=True)
+    dates = pd.Series(df["Date"].to_numpy()).groupby(doc_of_row) if "Date" in df.columns else None
+    out.insert(0, "n_findings", np.bincount(doc_of_row))
+    if dates is not None:
+        out.insert(1, "first_date", dates.min().dt.strftime("%Y-%m-%d").to_numpy())
+        out.insert(2, "last_date", dates.max().dt.strftime("%Y-%m-%d").to_numpy())
+    return pa.Table.from_pandas(out, preserve_index=False)
+
+
+def build_index(df: pd.DataFrame, features: TextFeatures, version: str, path: Path = INDEX_DIR,
+                n_tables: int = N_TABLES, n_bits: int = None, seed: int = SEED,
+                chunk_size: int = 50_000) -> None:
+    """
+    Escribe el índice de los textos distintos de 'features': vectores TF-IDF (CSR), idf,
+    claves LSH ordenadas por tabla y la tabla de documentos. Se escribe en un directorio
+    temporal y se sustituye el anterior al final.
+    """
+    X = features.matrix
+    n_bits = n_bits or bits_for(X.shape[0])
+    planes = projection(np.arange(N_FEATURES), n_tables * n_bits, seed)
+    keys = np.empty((X.shape[0], n_tables), dtype=np.uint32)
+    for lo in range(0, X.shape[0], chunk_size):
+        keys[lo:lo + chunk_size] = signatures(np.asarray(X[lo:lo + chunk_size] @ planes), n_tables, n_bits)
+
+    # Los textos vacíos no entran en las tablas (no se parecen a nada)
+    with_text = np.flatnonzero(np.diff(X.indptr) > 0).astype(np.int32)
+    order = np.empty((n_tables, len(with_text)), dtype=np.int32)
+    sorted_keys = np.empty((n_tables, len(with_text)), dtype=np.uint32)
+    for t in range(n_tables):
+        o = np.argsort(keys[with_text, t], kind="stable")
+        order[t], sorted_keys[t] = with_text[o], keys[with_text[o], t]
+
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    arrays = {"keys": sorted_keys, "order": order, "data": X.data.astype(np.float32),
+              "indices": X.indices.astype(np.int32), "indptr": X.indptr.astype(np.int64),
+              "idf": features.idf.astype(np.float32)}
+    for name, arr in arrays.items():
+        np.save(tmp / f"{name}.npy", arr)
+    feather.write_feather(_doc_table(df, features.doc_of_row), tmp / "docs.arrow", compression="uncompressed")
+    meta = {"format": INDEX_FORMAT, "fingerprint": fingerprint(n_tables, n_bits, seed),
+            "version": version, "features_tag": FEATURES_TAG, "n_docs": int(X.shape[0]),
+            "n_features": N_FEATURES, "token_pattern": TOKEN_PATTERN, "stop_words": sorted(STOP_WORDS),
+            "text_columns": TEXT_COLUMNS, "n_tables": n_tables, "n_bits": n_bits, "seed": seed}
+    with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+
+class SimilarityIndex:
+    """
+    Vecinos aproximados por coseno entre textos de findings. Todo se abre con memory-map:
+    una consulta busca su clave en cada tabla (búsqueda binaria), añade cubetas vecinas
+    (bits de menor margen) si hay pocos candidatos y reordena los candidatos por coseno exacto.
+    """
+
+    def __init__(self, path: Path = INDEX_DIR):
+        with open(path / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        for name in ["keys", "order", "data", "indices", "indptr", "idf"]:
+            setattr(self, name, np.load(path / f"{name}.npy", mmap_mode="r"))
+        self.docs = feather.read_table(path / "docs.arrow", memory_map=True)
+        self.n_tables, self.n_bits = self.meta["n_tables"], self.meta["n_bits"]
+
+    def __len__(self) -> int:
+        return self.meta["n_docs"]
+
+    def doc_vector(self, doc: int) -> tuple[np.ndarray, np.ndarray]:
+        """(columnas, pesos) del vector guardado de un texto."""
+        lo, hi = self.indptr[doc], self.indptr[doc + 1]
+        return np.asarray(self.indices[lo:hi]), np.asarray(self.data[lo:hi])
+
+    def text_vector(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        """(columnas, pesos) de un texto libre, con el idf del índice."""
+        X, _ = vectorize(pd.Series([text]), np.asarray(self.idf))
+        return X.indices, X.data
+
+    def candidates(self, cols: np.ndarray, weights: np.ndarray, min_candidates: int = 500,
+                   excluded: np.ndarray = None) -> np.ndarray:
+        """
+        Textos en la cubeta de la consulta en alguna tabla, ampliando a vecinas hasta
+        'min_candidates'. 'excluded': máscara por texto de los que no cuentan.
+        """
+        margins = weights @ projection(cols, self.n_tables * self.n_bits, self.meta["seed"])
+        keys = signatures(margins[None, :], self.n_tables, self.n_bits)[0]
+        margins = np.abs(margins.reshape(self.n_tables, self.n_bits))
+        flips = np.argsort(margins, axis=1)   # bits a cambiar para las cubetas vecinas, por tabla
+
+        found = []
+        for probe in range(self.n_bits + 1):
+            for t in range(self.n_tables):
+                key = keys[t] if probe == 0 else keys[t] ^ np.uint32(1 << int(flips[t, probe - 1]))
+                lo = np.searchsorted(self.keys[t], key, side="left")
+                hi = np.searchsorted(self.keys[t], key, side="right")
+                found.append(np.asarray(self.order[t, lo:hi]))
+            cands = np.unique(np.concatenate(found))
+            if excluded is not None:
+                cands = cands[~excluded[cands]]
+            if len(cands) >= min_candidates:
+                break
+        return cands
+
+    def scores(self, cols: np.ndarray, weights: np.ndarray, docs: np.ndarray) -> np.ndarray:
+        """Coseno exacto entre la consulta y cada texto de 'docs'."""
+        starts, ends = np.asarray(self.indptr[docs]), np.asarray(self.indptr[docs + 1])
+        lengths = ends - starts
+        nnz = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(lengths.sum())
+        dense = np.zeros(self.meta["n_features"], dtype=np.float32)
+        dense[cols] = weights
+        products = np.asarray(self.data[nnz]) * dense[np.asarray(self.indices[nnz])]
+        owner = np.repeat(np.arange(len(docs)), lengths)
+        return np.bincount(owner, weights=products, minlength=len(docs))
+
+    def search(self, cols: np.ndarray, weights: np.ndarray, k: int = 10, exclude=None) -> tuple[np.ndarray, np.ndarray]:
+        """(textos, similitud) de los k más parecidos, por similitud desc, sin los textos de 'exclude'."""
+        if len(cols) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        excluded = None
+        if exclude is not None:
+            excluded = np.zeros(len(self), dtype=bool)
+            excluded[np.asarray(exclude, dtype=np.int64)] = True
+        docs = self.candidates(cols, weights, min_candidates=max(500, 50 * k), excluded=excluded)
+        sim = self.scores(cols, weights, docs.astype(np.int64))
+        top = np.argsort(-sim, kind="stable")[:k]
+        top = top[sim[top] > 0]   # sin términos en común no hay parecido
+        return docs[top], sim[top]
+
+    def similar_to_text(self, text: str, k: int = 10) -> pd.DataFrame:
+        """Textos parecidos a un texto libre, con su tabla de documento."""
+        docs, sim = self.search(*self.text_vector(text), k=k)
+        out = self.docs.take(pa.array(docs)).to_pandas()
+        out.insert(0, "similarity", sim.round(4))
+        return out
+
+
+def get_similarity_index(dataset: FindingsDataset) -> SimilarityIndex:
+    """Índice de la versión actual: se abre de disco si coincide, si no se reconstruye."""
+    def _build(df: pd.DataFrame) -> SimilarityIndex:
+        try:
+            index = SimilarityIndex()
+            if (index.meta["version"] == dataset.version and index.meta["features_tag"] == FEATURES_TAG
+                    and index.meta.get("format") == INDEX_FORMAT):
+                return index
+        except Exception:
+            pass   # no existe o es ilegible: se reconstruye
+        build_index(df, get_text_features(dataset), dataset.version)
+        return SimilarityIndex()
+    return dataset.derived("similarity_index", _build)
+
+
+def _first_row_of_doc(dataset: FindingsDataset) -> np.ndarray:
+    """Primera fila (en orden por fecha) de cada texto distinto."""
+    def _build(df: pd.DataFrame) -> np.ndarray:
+        doc_of_row = get_text_features(dataset).doc_of_row
+        first = np.full(doc_of_row.max() + 1 if len(doc_of_row) else 0, len(doc_of_row), dtype=np.int64)
+        np.minimum.at(first, doc_of_row, np.arange(len(doc_of_row)))
+        return first
+    return dataset.derived("similarity_first_row", _build)
+
+
+def similar_findings(dataset: FindingsDataset, position: int, k: int = 10, earlier_only: bool = False) -> pd.DataFrame:
+    """
+    Findings de toda la flota cuyo texto está entre los k más parecidos al de la fila
+    'position' (sin el propio texto), con su similitud. 'earlier_only': sólo textos que
+    aparecen antes en el orden por fecha; se descartan antes de elegir los k, no después.
+    """
+    features = get_text_features(dataset)
+    index = get_similarity_index(dataset)
+    query = int(features.doc_of_row[position])
+    exclude = [query]
+    if earlier_only:
+        exclude = np.union1d(exclude, np.flatnonzero(_first_row_of_doc(dataset) >= position))
+    docs, sim = index.search(*index.doc_vector(query), k=k, exclude=exclude)
+    order = np.argsort(docs)
+    rows = np.flatnonzero(np.isin(features.doc_of_row, docs))
+    rows = rows[rows < position] if earlier_only else rows[rows != position]
+    similarity = sim[order][np.searchsorted(docs[order], features.doc_of_row[rows])]
+    return dataset.take(rows).assign(similarity=similarity.round(4))
@@ -9,11 +9,16 @@ from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.prebuilt import ToolNode
 
-from .prompts import SYSTEM_PROMPT, FEW_SHOTS
+from .prompts import SYSTEM_PROMPT, FEW_SHOTS, CATALOG_TEMPLATE
 from .tools import (
     get_engine,
-    list_schemas_tool, list_tables_tool, describe_table_tool, sample_rows_tool, run_sql_tool
+    list_schemas_tool, list_tables_tool, describe_table_tool, sample_rows_tool, run_sql_tool,
+    similar_findings_tool,
 )
+from .similar_findings import open_index
+from .cache import AnswerCache, ResultCache, table_version
+from .catalog import SchemaCatalog
+from .semantic_cache import SemanticCache
 from .settings import settings
 from .comet_safe_handler import SafeCometCallbackHandler  # se pasa a telemetry
 
@@ -44,14 +49,41 @@ comet_handler = comet.handler    # se usará en callbacks
 # Modelo + Herramientas
 # --------------------------------------------------------------------
 engine = get_engine(settings.database_url)
+catalog = SchemaCatalog(engine, refresh_s=settings.catalog_refresh_s)
 
+result_cache = ResultCache(
+    ttl_s=settings.result_cache_ttl_s,
+    max_entries=settings.result_cache_max_entries,
+    max_rows=settings.result_cache_max_rows,
+)
+run_sql = run_sql_tool(engine, result_cache, max_rows=settings.sql_max_rows)   # también lo usa la caché semántica para re-ejecutar SQL
 tools = [
-    list_schemas_tool(engine),
-    list_tables_tool(engine),
-    describe_table_tool(engine),
+    list_schemas_tool(catalog),
+    list_tables_tool(catalog),
+    describe_table_tool(catalog),
     sample_rows_tool(engine),
-    run_sql_tool(engine),
+    run_sql,
 ]
+similar_index = open_index(settings.similarity_index_dir)
+if similar_index is not None:
+    tools.append(similar_findings_tool(similar_index))
+
+answer_cache = AnswerCache(
+    settings.answer_cache_path,
+    ttl_s=settings.answer_cache_ttl_s,
+    max_entries=settings.answer_cache_max_entries,
+)
+semantic_cache = SemanticCache(
+    threshold=settings.semantic_cache_threshold,
+    max_entries=settings.semantic_cache_max_entries,
+)
+# Arranque en caliente con las preguntas ya respondidas que siguen en la caché de respuestas
+try:
+    for _question, _payload in reversed(answer_cache.recent(settings.semantic_cache_max_entries)):
+        if _payload.get("sql"):
+            semantic_cache.add(_question, _payload["sql"])
+except Exception as e:
+    print(f"[WARN] No se pudo precargar la caché semántica: {e}")
 
 llm = ChatOpenAI(
     model=settings.openai_model,
@@ -107,8 +139,16 @@ def _root_callbacks() -> List[Any]:
     """Callbacks que se aplican SOLO en la invocación raíz del grafo."""
     return build_root_callbacks(langfuse_handler, comet_handler, opik_tracer)
 
+def system_prompt() -> str:
+    """SYSTEM_PROMPT + catálogo compacto (sin catálogo si la BD no responde: el agente usará describe_table)."""
+    try:
+        return SYSTEM_PROMPT + "\n\n" + CATALOG_TEMPLATE.format(catalog=catalog.compact())
+    except Exception as e:
+        print(f"[WARN] Catálogo de esquema no disponible: {e}")
+        return SYSTEM_PROMPT
+
 def build_messages(question: str) -> List[Any]:
-    msgs: List[Any] = [SystemMessage(content=SYSTEM_PROMPT)]
+    msgs: List[Any] = [SystemMessage(content=system_prompt())]
     for shot in FEW_SHOTS:
         msgs.append(HumanMessage(content=shot["user"]))
         msgs.append(SystemMessage(content=f"SQL de referencia:\n{shot['sql']}"))
@@ -119,6 +159,66 @@ def build_messages(question: str) -> List[Any]:
 # Entrada principal
 # --------------------------------------------------------------------
 def ask_agent(question: str) -> Dict[str, Any]:
+    """
+    Respuesta cacheada si la misma pregunta (normalizada) ya se respondió con el mismo
+    prompt y la misma versión de datos; si una pregunta casi igual ya tiene SQL, se re-ejecuta
+    ese SQL sin LLM; si no, ejecuta el agente y guarda la respuesta.
+    """
+    t0 = time.perf_counter()
+    try:
+        key = AnswerCache.make_key(question, settings.prompt_name, settings.prompt_version,
+                                   table_version(engine, settings.findings_table))
+        cached = answer_cache.get(key)
+    except Exception as e:
+        print(f"[WARN] Caché de respuestas no disponible: {e}")
+        key, cached = None, None
+    if cached is not None:
+        try:
+            comet_exp.log_other("answer_cache", "hit")
+            comet_exp.log_other("latency_s", round(time.perf_counter() - t0, 4))
+        except Exception:
+            pass
+        return cached
+
+    result = _reuse_similar(question)
+    if result is None:
+        result = _run_agent(question)
+        if result.get("sql"):
+            semantic_cache.add(question, result["sql"])
+    # Sólo respuestas con datos (las aclaraciones dependen de la conversación)
+    if key is not None and result.get("sql"):
+        try:
+            answer_cache.put(key, question, result)
+        except Exception as e:
+            print(f"[WARN] No se pudo guardar la respuesta en caché: {e}")
+    return result
+
+
+def _reuse_similar(question: str) -> Optional[Dict[str, Any]]:
+    """Re-ejecuta el SQL de una pregunta casi igual (caché semántica); None si no hay o falla."""
+    match = semantic_cache.lookup(question)
+    if match is None:
+        return None
+    try:
+        payload = run_sql.func(sql=match["sql"], thought="semantic cache")
+    except Exception as e:
+        print(f"[WARN] SQL reutilizado falló, se consulta al agente: {e}")
+        return None
+    try:
+        comet_exp.log_other("semantic_cache", match["similarity"])
+    except Exception:
+        pass
+    return {
+        "answer_text": (f"Resultado de la consulta usada para una pregunta equivalente "
+                        f"(«{match['question']}», similitud {match['similarity']:.2f})."),
+        "sql": payload["sql"],
+        "columns": payload["columns"],
+        "rows": payload["rows"],
+        "truncated": payload.get("truncated", False),
+    }
+
+
+def _run_agent(question: str) -> Dict[str, Any]:
     # Construye mensajes y “nudge” para que EJECUTE run_sql si aplica
     msgs = build_messages(question)
     msgs.append(HumanMessage(content=(
@@ -141,6 +241,7 @@ def ask_agent(question: str) -> Dict[str, Any]:
     sql: Optional[str] = None
     columns: List[str] = []
     rows: List[List[Any]] = []
+    truncated = False
     for m in reversed(out["messages"]):
         if m.type == "tool":
             try:
@@ -151,6 +252,7 @@ def ask_agent(question: str) -> Dict[str, Any]:
                 sql = payload.get("sql")
                 columns = payload.get("columns") or payload.get("column_names") or []
                 rows = payload.get("rows") or []
+                truncated = bool(payload.get("truncated"))
                 break
 
     # Logs a Comet (independiente de Opik)
@@ -170,5 +272,6 @@ def ask_agent(question: str) -> Dict[str, Any]:
         "answer_text": clean_text,
         "sql": sql,
         "columns": columns,
-        "rows": rows
+        "rows": rows,
+        "truncated": truncated,
     }
@@ -0,0 +1,250 @@
+# app/api/cache.py
+"""
+Caché persistente (SQLite) de respuestas de ask_agent.
+Clave = pregunta normalizada + nombre/versión del prompt + versión de datos de la tabla de
+findings, así que una recarga con scripts/load_data.py o un prompt nuevo invalidan solos.
+Expira por TTL y, por encima de max_entries, se desalojan las menos usadas recientemente (LRU).
+Al final, la caché en memoria de resultados de run_sql (ResultCache).
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+# Formato de las respuestas guardadas (filas columnares + truncated); si cambia, no se reutilizan
+PAYLOAD_FORMAT = 2
+
+
+def normalize_question(question: str) -> str:
+    """Minúsculas, sin tildes, espacios colapsados y sin signos de apertura/cierre."""
+    q = unicodedata.normalize("NFKD", question or "")
+    q = "".join(ch for ch in q if not unicodedata.combining(ch)).lower()
+    q = re.sub(r"[¿?¡!.;,]+", " ", q)
+    return re.sub(r"\s+", " ", q).strip()
+
+
+def table_version(engine: Engine, schema_table: str) -> str:
+    """
+    Versión de datos de una tabla: oid (cambia con if_exists=replace) + comentario que
+    deja scripts/load_data.py en cada carga (cambia también con append). "" si no existe.
+    """
+    schema, table = schema_table.split(".", 1)
+    sql = text(
+        "SELECT c.oid, obj_description(c.oid, 'pg_class') "
+        "FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE n.nspname = :schema AND c.relname = :table"
+    )
+    with engine.connect() as conn:
+        row = conn.execute(sql, {"schema": schema, "table": table}).first()
+    return "" if row is None else f"{row[0]}:{row[1] or ''}"
+
+
+class AnswerCache:
+    def __init__(self, path: str, ttl_s: int = 86400, max_entries: int = 5000):
+        self.path = Path(path)
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT PRIMARY KEY, question TEXT, payload TEXT,"
+                " created_at REAL, last_access REAL, hits INTEGER DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_last_access ON answers(last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    @staticmethod
+    def make_key(question: str, prompt_name: str, prompt_version: str, data_version: str) -> str:
+        raw = json.dumps([normalize_question(question), prompt_name, prompt_version, data_version, PAYLOAD_FORMAT])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload, created_at FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            if now - row[1] > self.ttl_s:
+                conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                self._count("expired")
+                self._count("misses")
+                return None
+            conn.execute("UPDATE answers SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        self._count("hits")
+        return json.loads(row[0])
+
+    def put(self, key: str, question: str, payload: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (key, question, payload, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                (key, question, json.dumps(payload, default=str), now, now),
+            )
+            conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_s,))
+            evicted = conn.execute(
+                "DELETE FROM answers WHERE key IN ("
+                " SELECT key FROM answers ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        self._count("stores")
+        self._count("evictions", max(evicted, 0))
+
+    def recent(self, limit: int = 1000) -> List[Tuple[str, Dict[str, Any]]]:
+        """(pregunta, respuesta) de las entradas vigentes usadas más recientemente."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT question, payload FROM answers WHERE created_at >= ? ORDER BY last_access DESC LIMIT ?",
+                (time.time() - self.ttl_s, limit),
+            ).fetchall()
+        return [(q, json.loads(p)) for q, p in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            entries, hits_stored = conn.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM answers").fetchone()
+        with self._lock:
+            out = dict(self._stats)
+        lookups = out["hits"] + out["misses"]
+        out.update({
+            "lookups": lookups,
+            "hit_rate": round(out["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "hits_on_stored_entries": hits_stored,
+            "ttl_s": self.ttl_s,
+            "max_entries": self.max_entries,
+        })
+        return out
+
+
+# --------------------------------------------------------------------
+# Caché de resultados de run_sql (en memoria, con single-flight)
+# --------------------------------------------------------------------
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"[^\"]*\")")
+_TABLE_REF = re.compile(r'\b(?:from|join)\s+((?:"[^"]+"|\w+)(?:\.(?:"[^"]+"|\w+))?)', re.IGNORECASE)
+
+
+def normalize_sql(sql: str) -> str:
+    """Espacios colapsados fuera de literales y sin ';' final (mismo SQL = misma clave)."""
+    parts = _QUOTED.split(sql.strip().rstrip(";").strip())
+    return "".join(p if i % 2 else re.sub(r"\s+", " ", p) for i, p in enumerate(parts)).strip()
+
+
+def referenced_tables(sql: str) -> List[str]:
+    """Tablas tras FROM/JOIN (fuera de literales); los nombres de CTE no existen y no versionan."""
+    code = "".join(p for i, p in enumerate(_QUOTED.split(sql)) if i % 2 == 0 or p.startswith('"'))
+    return sorted(set(_TABLE_REF.findall(code)))
+
+
+def table_versions(engine: Engine, tables: List[str]) -> Dict[str, str]:
+    """Versión (oid + sello de carga) de cada tabla, resolviendo nombres como Postgres."""
+    sql = text("SELECT to_regclass(:name)::oid, obj_description(to_regclass(:name), 'pg_class')")
+    out = {}
+    with engine.connect() as conn:
+        for name in tables:
+            oid, comment = conn.execute(sql, {"name": name}).first()
+            out[name] = "" if oid is None else f"{oid}:{comment or ''}"
+    return out
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResultCache:
+    """
+    Resultados de SELECT por (SQL normalizado, versión de las tablas que lee): una recarga
+    con scripts/load_data.py cambia la versión y la entrada deja de usarse. Las consultas
+    idénticas simultáneas esperan a una única ejecución (single-flight).
+    """
+
+    def __init__(self, ttl_s: int = 600, max_entries: int = 256, max_rows: int = 5000):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "executions": 0, "errors": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(sql: str, versions: Dict[str, str]) -> str:
+        raw = json.dumps([normalize_sql(sql), sorted(versions.items())])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_or_execute(self, key: str, execute) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] <= self.ttl_s:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = execute()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._stats["executions"] += 1
+                if flight.error is not None:
+                    self._stats["errors"] += 1
+                elif len(flight.result.get("rows", [])) <= self.max_rows:
+                    self._entries[key] = (time.time(), flight.result)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self._stats["evictions"] += 1
+                del self._inflight[key]
+            flight.event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats, entries=len(self._entries), in_flight=len(self._inflight))
+        lookups = out["hits"] + out["misses"] + out["coalesced"]
+        out.update({
+            "lookups": lookups,
+            "hit_rate": round((out["hits"] + out["coalesced"]) / lookups, 4) if lookups else 0.0,
+            "ttl_s": self.ttl_s,
+            "max_entries": self.max_entries,
+            "max_rows": self.max_rows,
+        })
+        return out
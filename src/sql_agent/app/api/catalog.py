@@ -0,0 +1,100 @@
+# app/api/catalog.py
+"""
+Catálogo del esquema en memoria: esquemas, tablas y columnas se leen una vez (una consulta
+a information_schema) y se sirven desde aquí a list_schemas/list_tables/describe_table y al
+prompt de sistema. Se recarga sólo si cambia la huella de las tablas (oid, nº de columnas y
+comentario de carga de cada una, ver scripts/load_data.py), comprobada como mucho cada
+refresh_s segundos.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+_SYSTEM_SCHEMAS = "('information_schema', 'pg_catalog', 'pg_toast')"
+
+FINGERPRINT_SQL = text(f"""
+SELECT n.nspname, c.relname, c.oid, c.relnatts, obj_description(c.oid, 'pg_class')
+FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+  AND n.nspname NOT IN {_SYSTEM_SCHEMAS} AND n.nspname NOT LIKE 'pg\\_%'
+ORDER BY 1, 2
+""")
+
+SCHEMAS_SQL = text(f"""
+SELECT nspname FROM pg_namespace
+WHERE nspname NOT IN {_SYSTEM_SCHEMAS} AND nspname NOT LIKE 'pg\\_%'
+ORDER BY 1
+""")
+
+COLUMNS_SQL = text(f"""
+SELECT table_schema, table_name, column_name, data_type, is_nullable
+FROM information_schema.columns
+WHERE table_schema NOT IN {_SYSTEM_SCHEMAS} AND table_schema NOT LIKE 'pg\\_%'
+ORDER BY table_schema, table_name, ordinal_position
+""")
+
+
+class SchemaCatalog:
+    def __init__(self, engine: Engine, refresh_s: float = 30.0):
+        self.engine = engine
+        self.refresh_s = refresh_s
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self._schemas: List[str] = []
+        self._columns: Dict[str, List[Dict[str, Any]]] = {}
+        self.loads = 0
+
+    def _refresh(self) -> None:
+        """Recarga si cambió la huella (o en la primera llamada); barato si no cambió."""
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.refresh_s and self._fingerprint is not None:
+                return
+            with self.engine.connect() as conn:
+                fingerprint = tuple(tuple(r) for r in conn.execute(FINGERPRINT_SQL))
+                if fingerprint != self._fingerprint:
+                    schemas = [r[0] for r in conn.execute(SCHEMAS_SQL)]
+                    columns: Dict[str, List[Dict[str, Any]]] = {}
+                    for sch, tbl, col, typ, nullable in conn.execute(COLUMNS_SQL):
+                        columns.setdefault(f"{sch}.{tbl}", []).append(
+                            {"name": col, "type": typ, "nullable": nullable == "YES"})
+                    self._schemas, self._columns = schemas, columns
+                    self._fingerprint = fingerprint
+                    self.loads += 1
+            self._checked_at = time.monotonic()
+
+    def schemas(self) -> List[str]:
+        self._refresh()
+        return list(self._schemas)
+
+    def tables(self, schema: Optional[str] = None) -> List[str]:
+        self._refresh()
+        return sorted(t for t in self._columns if schema is None or t.split(".", 1)[0] == schema)
+
+    def columns(self, schema_table: str) -> List[Dict[str, Any]]:
+        """Columnas de schema.table (acepta comillas y mayúsculas distintas); KeyError si no existe."""
+        self._refresh()
+        name = schema_table.replace('"', "").strip()
+        if name in self._columns:
+            return self._columns[name]
+        matches = [t for t in self._columns if t.lower() == name.lower()]
+        if not matches:
+            raise KeyError(schema_table)
+        return self._columns[matches[0]]
+
+    def compact(self, max_chars: int = 6000) -> str:
+        """Una línea por tabla: schema.table: "col" tipo, ... (para el prompt de sistema)."""
+        self._refresh()
+        lines, size = [], 0
+        for table in sorted(self._columns):
+            cols = ", ".join(f'"{c["name"]}" {c["type"]}' for c in self._columns[table])
+            line = f"- {table}: {cols}"
+            if size + len(line) > max_chars:
+                lines.append(f"- … ({len(self._columns) - len(lines)} tablas más: usa list_tables/describe_table)")
+                break
+            lines.append(line)
+            size += len(line) + 1
+        return "\n".join(lines)
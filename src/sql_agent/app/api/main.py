@@ -2,7 +2,7 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from .agent import ask_agent
+from .agent import ask_agent, answer_cache, semantic_cache, result_cache
 
 
 
@@ -21,12 +21,17 @@ class QueryResponse(BaseModel):
     answer_text: str | None = None
     sql: str | None = None
     columns: list[str] = []
-    rows: list[dict] = []
+    rows: list[list] = []      # columnar: una lista por fila, en el orden de 'columns'
+    truncated: bool = False    # run_sql cortó el resultado en SQL_MAX_ROWS filas
 
 @app.get("/healthz")
 def healthz():
     return {"status":"ok"}
 
+@app.get("/cache/stats")
+def cache_stats():
+    return {"answers": answer_cache.stats(), "semantic": semantic_cache.stats(), "results": result_cache.stats()}
+
 @app.post("/query", response_model=QueryResponse)
 def query(req: QueryRequest):
     try:
@@ -0,0 +1,160 @@
+# app/api/semantic_cache.py
+"""
+Caché semántica de preguntas: detecta preguntas casi iguales escritas de otra forma
+("top 5 tipos de fallo últimos 90 días" / "5 failure types más frecuentes 90 días") y
+reutiliza el SQL de la primera, que se vuelve a ejecutar (datos al día) sin pasar por el LLM.
+
+Vectores: n-gramas de caracteres (3..5) de las palabras de la pregunta normalizada (sinónimos
+del dominio unificados, sin palabras vacías), con hashing y norma L2 (sin modelo). Índice:
+matriz densa en memoria, búsqueda por producto escalar.
+Salvaguardas: números e identificadores (matrículas, fechas, ATA...) deben coincidir exactamente,
+y también el conjunto de palabras de contenido ("por modelo", "en cabina", "no" cambian el
+resultado aunque apenas cambien el texto).
+"""
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
+from collections import deque
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from .cache import normalize_question
+
+N_DIM = 2**12
+NGRAMS = (3, 4, 5)
+# Sinónimos del dominio (como en prompts.py) -> forma canónica; se aplican antes de vectorizar
+SYNONYMS = {
+    "failure types": "tipos fallo", "failure type": "tipo fallo", "tipos de fallo": "tipos fallo",
+    "tipo de fallo": "tipo fallo", "most frequent": "top", "mas frecuentes": "top", "mas comunes": "top",
+    "aircraft registration": "matricula", "registration": "matricula", "tailnumber": "matricula",
+    "aircraft model": "modelo", "model": "modelo", "work order": "wo", "orden de trabajo": "wo",
+    "task card": "taskcard", "last": "ultimos", "days": "dias", "months": "meses", "between": "entre",
+}
+_SYNONYMS = re.compile(r"\b(" + "|".join(sorted(map(re.escape, SYNONYMS), key=len, reverse=True)) + r")\b")
+# Palabras vacías; las negaciones (no, sin, not, without...) NO lo son: cuentan como contenido.
+# "ultimos"/"last" tampoco cambian nada ("últimos 90 días" = "90 días")
+STOP_WORDS = frozenset("""
+a al de del el en la las lo los y o con por para que cual cuales son es dame muestra dime me
+the of in on for and or with what which are is show give me list ultimos
+""".split())
+# Literales: palabras con dígitos o separadores internos (5, a320, EC-MAA, 32-11, 2025-07-01, issue_date)
+WORD = re.compile(r"[a-z0-9]+(?:[-/.:_][a-z0-9]+)*")
+LITERAL = re.compile(r"\d|[-/.:_]")
+
+
+def canonical(question: str) -> str:
+    """Pregunta normalizada, con sinónimos del dominio unificados y sin palabras vacías."""
+    q = _SYNONYMS.sub(lambda m: SYNONYMS[m.group(1)], normalize_question(question))
+    return " ".join(w for w in q.split() if w not in STOP_WORDS)
+
+
+def embed(question: str) -> np.ndarray:
+    """n-gramas de caracteres de cada palabra (con sus bordes) + la palabra entera, con hashing."""
+    vec = np.zeros(N_DIM, dtype=np.float32)
+    for word in canonical(question).split():
+        w = f" {word} "
+        grams = [w[i:i + n] for n in NGRAMS for i in range(len(w) - n + 1)] + [word]
+        for g in grams:
+            vec[zlib.crc32(g.encode("utf-8")) % N_DIM] += 1
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def literals(question: str) -> Tuple[str, ...]:
+    return tuple(sorted({w for w in WORD.findall(normalize_question(question)) if LITERAL.search(w)}))
+
+
+def content_words(question: str) -> FrozenSet[str]:
+    """Palabras canónicas de la pregunta (sinónimos unificados, sin vacías, con negaciones)."""
+    return frozenset(canonical(question).split())
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1000, history: int = 5000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((0, N_DIM), dtype=np.float32)
+        self._entries: List[Dict[str, Any]] = []   # question, literals, words, sql
+        # Mejor similitud de cada búsqueda (para ajustar el umbral) y últimos emparejamientos
+        self._best = deque(maxlen=history)
+        self._recent = deque(maxlen=20)
+        self._stats = {"hits": 0, "misses": 0, "blocked_by_literals": 0, "blocked_by_words": 0, "adds": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, question: str, sql: str) -> None:
+        """Registra una pregunta ya respondida con su SQL (sustituye a la misma pregunta normalizada)."""
+        vec = embed(question)
+        norm_q = normalize_question(question)
+        with self._lock:
+            keep = [i for i, e in enumerate(self._entries) if e["normalized"] != norm_q]
+            keep = keep[max(len(keep) - self.max_entries + 1, 0):]
+            self._entries = [self._entries[i] for i in keep] + [
+                {"question": question, "normalized": norm_q, "literals": literals(question),
+                 "words": content_words(question), "sql": sql}]
+            self._vectors = np.vstack([self._vectors[keep], vec[None, :]])
+            self._stats["adds"] += 1
+
+    def lookup(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Entrada más parecida que supera el umbral con los mismos literales y las mismas
+        palabras de contenido; None si no hay ninguna.
+        """
+        vec = embed(question)
+        lits = literals(question)
+        words = content_words(question)
+        with self._lock:
+            if not self._entries:
+                self._stats["misses"] += 1
+                return None
+            sims = self._vectors @ vec
+            order = np.argsort(-sims)
+            best = float(sims[order[0]])
+            self._best.append(best)
+            match, blocked = None, None
+            for i in order:
+                if sims[i] < self.threshold:
+                    break
+                entry = self._entries[i]
+                if entry["literals"] != lits:
+                    blocked = blocked or "blocked_by_literals"
+                elif entry["words"] != words:
+                    blocked = blocked or "blocked_by_words"
+                else:
+                    match = dict(entry, similarity=round(float(sims[i]), 4))
+                    break
+            if match is None and blocked:
+                self._stats[blocked] += 1
+            self._stats["hits" if match else "misses"] += 1
+            self._recent.append({"question": question, "nearest": self._entries[order[0]]["question"],
+                                 "similarity": round(best, 4), "hit": match is not None})
+        return match
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            best = np.array(self._best, dtype=np.float64)
+            out = dict(self._stats)
+            recent = list(self._recent)
+        lookups = out["hits"] + out["misses"]
+        edges = np.round(np.linspace(0, 1, 21), 2)
+        counts, _ = np.histogram(best, bins=edges)
+        out.update({
+            "entries": len(self),
+            "threshold": self.threshold,
+            "lookups": lookups,
+            "hit_rate": round(out["hits"] / lookups, 4) if lookups else 0.0,
+            # distribución de la mejor similitud por búsqueda: dónde cae el umbral
+            "best_similarity": {
+                "n": int(len(best)),
+                "quantiles": {q: round(float(np.quantile(best, q)), 4) for q in (0.5, 0.75, 0.9, 0.95, 0.99)}
+                if len(best) else {},
+                "histogram": [{"from": float(lo), "to": float(hi), "count": int(c)}
+                              for lo, hi, c in zip(edges[:-1], edges[1:], counts)],
+                "near_misses": int(((best >= self.threshold - 0.1) & (best < self.threshold)).sum()),
+            },
+            "recent": recent,
+        })
+        return out
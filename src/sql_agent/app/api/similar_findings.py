@@ -0,0 +1,144 @@
+# app/api/similar_findings.py
+"""
+Lectura del índice de findings parecidos que genera el dashboard (src/similarity_index.py):
+vectores TF-IDF con hashing + LSH por proyecciones aleatorias, todo en ficheros .npy que se
+abren con memory-map. Aquí sólo se consulta: meta.json trae tokenización, idf y parámetros,
+así que el agente no necesita el código del dashboard ni scipy.
+El hashing de tokens, la proyección y las claves LSH son una copia de las del dashboard: al
+abrir se comparan el formato y la huella de meta.json con los de esta copia y, si no coinciden,
+se lanza IndexFormatError (las consultas darían resultados erróneos sin avisar).
+"""
+from typing import List, Dict, Any, Optional
+from pathlib import Path
+import hashlib
+import json
+import re
+
+import numpy as np
+import pandas as pd
+from pyarrow import feather
+import pyarrow as pa
+
+
+# Deben coincidir con src/similarity_index.py (INDEX_FORMAT, FINGERPRINT_TOKENS)
+INDEX_FORMAT = 1
+FINGERPRINT_TOKENS = ["engine", "hydraulic", "leak", "fwd", "cargo", "door", "a320", "0"]
+
+
+class IndexFormatError(RuntimeError):
+    """El índice lo generó un dashboard con otro formato o hashing que este lector."""
+
+
+def _buckets(tokens, n_features: int) -> np.ndarray:
+    return (pd.util.hash_array(np.asarray(tokens, dtype=object)) % np.uint64(n_features)).astype(np.int64)
+
+
+def _projection(buckets: np.ndarray, n_planes: int, seed: int) -> np.ndarray:
+    # Mismo splitmix64 que src/similarity_index.projection (signo por columna e hiperplano)
+    keys = (np.asarray(buckets, dtype=np.uint64)[:, None] * np.uint64(n_planes)
+            + np.arange(n_planes, dtype=np.uint64)[None, :])
+    with np.errstate(over="ignore"):
+        h = keys + np.uint64(seed + 1) * np.uint64(0x9E3779B97F4A7C15)
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        h = h ^ (h >> np.uint64(31))
+    return np.where(h >> np.uint64(63), 1, -1).astype(np.float32)
+
+
+def _keys(margins: np.ndarray, n_tables: int, n_bits: int) -> np.ndarray:
+    # Mismo orden de bits que src/similarity_index.signatures
+    bits = (margins.reshape(n_tables, n_bits) > 0).astype(np.uint32)
+    return (bits << np.arange(n_bits, dtype=np.uint32)).sum(axis=1, dtype=np.uint32)
+
+
+def _fingerprint(n_features: int, n_tables: int, n_bits: int, seed: int) -> str:
+    buckets = _buckets(FINGERPRINT_TOKENS, n_features)
+    weights = np.linspace(1, 2, len(buckets), dtype=np.float32)
+    keys = _keys(weights @ _projection(buckets, n_tables * n_bits, seed), n_tables, n_bits)
+    return hashlib.sha256(buckets.tobytes() + keys.tobytes()).hexdigest()[:16]
+
+
+class SimilarFindingsIndex:
+    """Índice abierto desde disco; se reabre solo si el dashboard lo regenera (cambia meta.json)."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._mtime = None
+        self._open()
+
+    def _open(self) -> None:
+        meta_path = self.path / "meta.json"
+        mtime = meta_path.stat().st_mtime
+        if mtime == self._mtime:
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        expected = _fingerprint(meta["n_features"], meta["n_tables"], meta["n_bits"], meta["seed"])
+        if meta.get("format") != INDEX_FORMAT or meta.get("fingerprint") != expected:
+            raise IndexFormatError(
+                f"{self.path}: formato {meta.get('format')} / huella {meta.get('fingerprint')}, este lector "
+                f"espera {INDEX_FORMAT} / {expected}. Actualiza app/api/similar_findings.py o regenera el "
+                f"índice abriendo Home en el dashboard."
+            )
+        self.meta = meta
+        for name in ["keys", "order", "data", "indices", "indptr", "idf"]:
+            setattr(self, name, np.load(self.path / f"{name}.npy", mmap_mode="r"))
+        self.docs = feather.read_table(self.path / "docs.arrow", memory_map=True)
+        self.stop_words = set(self.meta["stop_words"])
+        self._mtime = mtime
+
+    def _vector(self, text: str):
+        tokens = [t for t in re.findall(self.meta["token_pattern"], text.lower()) if t not in self.stop_words]
+        if not tokens:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        cols, counts = np.unique(_buckets(tokens, self.meta["n_features"]), return_counts=True)
+        weights = (1 + np.log(counts)) * np.asarray(self.idf[cols])
+        return cols, (weights / np.linalg.norm(weights)).astype(np.float32)
+
+    def _candidates(self, cols: np.ndarray, weights: np.ndarray, min_candidates: int) -> np.ndarray:
+        n_tables, n_bits = self.meta["n_tables"], self.meta["n_bits"]
+        margins = weights @ _projection(cols, n_tables * n_bits, self.meta["seed"])
+        keys = _keys(margins, n_tables, n_bits)
+        flips = np.argsort(np.abs(margins.reshape(n_tables, n_bits)), axis=1)
+        found = []
+        for probe in range(n_bits + 1):
+            for t in range(n_tables):
+                key = keys[t] if probe == 0 else keys[t] ^ np.uint32(1 << int(flips[t, probe - 1]))
+                lo = np.searchsorted(self.keys[t], key, side="left")
+                hi = np.searchsorted(self.keys[t], key, side="right")
+                found.append(np.asarray(self.order[t, lo:hi]))
+            cands = np.unique(np.concatenate(found)).astype(np.int64)
+            if len(cands) >= min_candidates:
+                break
+        return cands
+
+    def search(self, text: str, k: int = 10) -> List[Dict[str, Any]]:
+        self._open()
+        cols, weights = self._vector(text)
+        if len(cols) == 0:
+            return []
+        docs = self._candidates(cols, weights, max(500, 50 * k))
+        starts, ends = np.asarray(self.indptr[docs]), np.asarray(self.indptr[docs + 1])
+        lengths = ends - starts
+        nnz = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(lengths.sum())
+        dense = np.zeros(self.meta["n_features"], dtype=np.float32)
+        dense[cols] = weights
+        products = np.asarray(self.data[nnz]) * dense[np.asarray(self.indices[nnz])]
+        sim = np.bincount(np.repeat(np.arange(len(docs)), lengths), weights=products, minlength=len(docs))
+        top = np.argsort(-sim, kind="stable")[:k]
+        top = top[sim[top] > 0]
+        out = self.docs.take(pa.array(docs[top])).to_pandas()
+        out.insert(0, "similarity", sim[top].round(4))
+        return json.loads(out.to_json(orient="records"))
+
+
+def open_index(path: str) -> Optional[SimilarFindingsIndex]:
+    """
+    Índice en 'path' o None si aún no se ha generado (la herramienta no se registra).
+    Un índice de otro formato no se ignora: IndexFormatError.
+    """
+    try:
+        return SimilarFindingsIndex(path) if path else None
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[WARN] Índice de findings parecidos no disponible en {path}: {e}")
+        return None
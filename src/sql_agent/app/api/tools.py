@@ -1,11 +1,14 @@
 # app/api/tools.py
 from typing import List, Dict, Any, Optional, Tuple
 import re
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 from langchain.tools import StructuredTool
 from pydantic import BaseModel, Field
 
+from .cache import ResultCache, referenced_tables, table_versions
+from .catalog import SchemaCatalog
+
 FORBIDDEN = re.compile(r"\b(INSERT|UPDATE|DELETE|DROP|ALTER|CREATE|TRUNCATE|GRANT|REVOKE|MERGE|CALL|EXECUTE)\b", re.IGNORECASE)
 
 def get_engine(database_url: str) -> Engine:
@@ -32,33 +35,26 @@ class SampleRowsInput(BaseModel):
     schema_table: str = Field(..., description="Nombre completo schema.table")
     limit: int = Field(50, ge=1, le=200, description="Límite de filas")
 
+class SimilarFindingsInput(BaseModel):
+    text: str = Field(..., description="Texto del fallo a comparar (descripción, acción...)")
+    k: int = Field(10, ge=1, le=50, description="Nº de textos parecidos a devolver")
+
 class RunSqlInput(BaseModel):
     sql: str = Field(..., description="Consulta SELECT segura")
     thought: str = Field(..., description="Breve plan (no se muestra al usuario)")
 
-def list_schemas_tool(engine: Engine):
+def list_schemas_tool(catalog: SchemaCatalog):
     def _list_schemas() -> List[str]:
-        insp = inspect(engine)
-        schemas = [s for s in insp.get_schema_names() if s not in ("information_schema", "pg_catalog", "pg_toast") ]
-        return sorted(schemas)
+        return catalog.schemas()
     return StructuredTool.from_function(
         name="list_schemas",
         description="Lista esquemas disponibles en la base de datos.",
         func=_list_schemas
     )
 
-def list_tables_tool(engine: Engine):
+def list_tables_tool(catalog: SchemaCatalog):
     def _list_tables(schema: Optional[str] = None) -> List[str]:
-        insp = inspect(engine)
-        schemas = [schema] if schema else [s for s in insp.get_schema_names() if s not in ("information_schema", "pg_catalog", "pg_toast") ]
-        out = []
-        for sch in schemas:
-            try:
-                for t in insp.get_table_names(schema=sch):
-                    out.append(f"{sch}.{t}")
-            except Exception:
-                continue
-        return sorted(out)
+        return catalog.tables(schema)
     return StructuredTool.from_function(
         name="list_tables",
         description="Lista tablas; si pasas schema, filtra por ese esquema.",
@@ -66,49 +62,87 @@ def list_tables_tool(engine: Engine):
         args_schema=ListTablesInput
     )
 
-def describe_table_tool(engine: Engine):
+def describe_table_tool(catalog: SchemaCatalog):
     def _describe(schema_table: str) -> List[Dict[str, Any]]:
-        insp = inspect(engine)
         if "." not in schema_table:
             raise ValueError("Usa schema.table")
-        schema, table = schema_table.split(".", 1)
-        cols = insp.get_columns(table, schema=schema)
-        return [{"name": c["name"], "type": str(c["type"]), "nullable": c.get("nullable", True)} for c in cols]
+        try:
+            return catalog.columns(schema_table)
+        except KeyError:
+            raise ValueError(f"No existe la tabla {schema_table}; usa list_tables.")
     return StructuredTool.from_function(
         name="describe_table",
         description="Describe columnas de una tabla (schema.table).",            func=_describe,
         args_schema=DescribeTableInput
     )
 
+def fetch_bounded(engine: Engine, sql: str, params: Optional[Dict[str, Any]] = None,
+                  max_rows: int = 500) -> Dict[str, Any]:
+    """
+    Ejecuta con cursor de servidor (stream_results/yield_per) y lee como mucho max_rows filas:
+    memoria y latencia acotadas sea cual sea el SQL. Formato columnar (columnas + filas como
+    listas) y 'truncated' si había más filas.
+    """
+    with engine.connect() as conn:
+        rs = conn.execution_options(stream_results=True, yield_per=min(max_rows + 1, 1000)).execute(
+            text(sql), params or {})
+        try:
+            cols = list(rs.keys())
+            rows = rs.fetchmany(max_rows + 1)
+        finally:
+            rs.close()   # cierra el cursor de servidor sin leer el resto
+    return {
+        "columns": cols,
+        "rows": [list(r) for r in rows[:max_rows]],
+        "row_count": min(len(rows), max_rows),
+        "truncated": len(rows) > max_rows,
+    }
+
 def sample_rows_tool(engine: Engine):
     def _sample(schema_table: str, limit: int = 50) -> Dict[str, Any]:
         if "." not in schema_table:
             raise ValueError("Usa schema.table")
         sql = f"SELECT * FROM {schema_table} ORDER BY 1 DESC LIMIT :limit"
-        with engine.begin() as conn:
-            rs = conn.execute(text(sql), {"limit": limit})
-            rows = [dict(r._mapping) for r in rs]
-            cols = list(rows[0].keys()) if rows else []
-        return {"columns": cols, "rows": rows, "limit": limit}
+        return {**fetch_bounded(engine, sql, {"limit": limit}, max_rows=limit), "limit": limit}
     return StructuredTool.from_function(
         name="sample_rows",
         description="Muestra filas de una tabla (schema.table).",            func=_sample,
         args_schema=SampleRowsInput
     )
 
-def run_sql_tool(engine: Engine):
+def run_sql_tool(engine: Engine, cache: Optional[ResultCache] = None, max_rows: int = 500):
+    def _execute(sql: str) -> Dict[str, Any]:
+        return {"sql": sql.strip().rstrip(";"), **fetch_bounded(engine, sql, max_rows=max_rows)}
+
     def _run(sql: str, thought: str) -> Dict[str, Any]:
         ok, err = is_safe_select(sql)
         if not ok:
             raise ValueError(err)
-        with engine.begin() as conn:
-            rs = conn.execute(text(sql))
-            rows = [dict(r._mapping) for r in rs]
-            cols = list(rows[0].keys()) if rows else []
-        return {"sql": sql.strip().rstrip(";"), "columns": cols, "rows": rows}
+        if cache is None:
+            return _execute(sql)
+        # Clave: SQL normalizado + versión de cada tabla leída (cambia al recargar con load_data.py)
+        try:
+            versions = table_versions(engine, referenced_tables(sql))
+        except Exception:
+            return _execute(sql)
+        return cache.get_or_execute(ResultCache.make_key(sql, versions), lambda: _execute(sql))
     return StructuredTool.from_function(
         name="run_sql",
-        description="Ejecuta un SELECT seguro y devuelve columnas/filas.",
+        description=("Ejecuta un SELECT seguro y devuelve columnas + filas (listas en el orden de "
+                     "columnas). Como mucho un nº fijo de filas: si 'truncated' es true, agrega o pon LIMIT."),
         func=_run,
         args_schema=RunSqlInput
     )
+
+def similar_findings_tool(index):
+    """'index': app.api.similar_findings.SimilarFindingsIndex (índice LSH generado por el dashboard)."""
+    def _similar(text: str, k: int = 10) -> Dict[str, Any]:
+        return {"query": text, "results": index.search(text, k)}
+    return StructuredTool.from_function(
+        name="similar_findings",
+        description=("Busca findings con descripción parecida a un texto (vecinos aproximados sobre "
+                     "el texto, en milisegundos). Devuelve similitud, nº de findings con ese texto, "
+                     "primera/última fecha y el finding más reciente (WO, task, matrícula, ATA)."),
+        func=_similar,
+        args_schema=SimilarFindingsInput
+    )
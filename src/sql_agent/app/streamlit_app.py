@@ -50,6 +50,8 @@ for m in st.session_state.messages:
                 # fallback por si rows ya viene como list[dict]
                 df = pd.DataFrame(m["rows"])
             st.dataframe(df, use_container_width=True, hide_index=True)
+            if m.get("truncated"):
+                st.caption(f"Resultado recortado a {len(m['rows'])} filas.")
 
 # --- Entrada de chat (sólo aquí se POSTEA)
 user_msg = st.chat_input("Escribe tu pregunta (Enter para enviar)...")
@@ -77,6 +79,7 @@ if user_msg:
         sql = data.get("sql")
         columns = data.get("columns", [])
         rows = data.get("rows", [])
+        truncated = data.get("truncated", False)
 
         # Guarda ambos formatos; cambiar de pestaña sólo re-renderiza
         assistant_msg = {
@@ -85,6 +88,7 @@ if user_msg:
             "sql": sql,
             "columns": columns,
             "rows": rows,
+            "truncated": truncated,
         }
         st.session_state.messages.append(assistant_msg)
 
@@ -101,6 +105,8 @@ if user_msg:
                 except Exception:
                     df = pd.DataFrame(rows)
                 st.dataframe(df, use_container_width=True, hide_index=True)
+                if truncated:
+                    st.caption(f"Resultado recortado a {len(rows)} filas.")
 
     except Exception as e:
         st.error(f"Error: {e}")
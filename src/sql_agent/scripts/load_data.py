@@ -1,6 +1,9 @@
 # scripts/load_data.py
 import os
 import time
+import json
+import hashlib
+from datetime import datetime, timezone
 from pathlib import Path
 import pandas as pd
 from sqlalchemy import create_engine, text
@@ -69,6 +72,24 @@ def read_any(path: Path, sheet_hint: str) -> pd.DataFrame:
                 last = e
         raise SystemExit(f"[ERROR] No pude leer el CSV con utf-8/utf-8-sig/cp1252/latin1.\nÚltimo error: {last}")
 
+def stamp_table(engine, path: Path, n_rows: int):
+    """
+    Deja en el comentario de la tabla un sello de la carga: junto con el oid de la tabla es
+    la versión de datos que usa el agente para invalidar sus cachés.
+    """
+    stamp = json.dumps({
+        "loaded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "source": path.name,
+        "sha256": hashlib.sha256(path.read_bytes()).hexdigest()[:16],
+        "rows": n_rows,
+        "if_exists": IF_EXISTS,
+    })
+    literal = "'" + stamp.replace("'", "''") + "'"
+    with engine.begin() as conn:
+        # exec_driver_sql: el sello lleva ':' que text() tomaría por parámetros
+        conn.exec_driver_sql(f'COMMENT ON TABLE "{TARGET_SCHEMA}"."{TARGET_TABLE}" IS {literal}')
+    print(f"[INFO] Sello de versión: {stamp}")
+
 def main():
     # Resolver ruta del archivo
     p = Path(DATA_FILE)
@@ -102,6 +123,8 @@ def main():
         chunksize=1000,
     )
 
+    stamp_table(engine, p, len(df))
+
     print(f"[OK] Carga completada: {TARGET_SCHEMA}.{TARGET_TABLE}")
 
 if __name__ == "__main__":
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# src/sql_agent en el path, como en el contenedor ('app' se importa como paquete)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,50 @@
+import types
+
+import pytest
+
+pytest.importorskip("langchain_openai", reason="requiere las dependencias de src/sql_agent/requirements.txt")
+
+from app.api import cache as cache_module  # noqa: E402
+from app.api.cache import AnswerCache, normalize_question  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_normalize_question():
+    assert normalize_question("  ¿Cuáles son   los TOP 5 fallos?  ") == "cuales son los top 5 fallos"
+
+
+def test_key_changes_with_prompt_and_data_version():
+    key = AnswerCache.make_key("¿Top 5 fallos?", "aero", "1.2.0", "123:load-1")
+    assert key == AnswerCache.make_key("top 5 fallos", "aero", "1.2.0", "123:load-1")
+    assert key != AnswerCache.make_key("top 5 fallos", "aero", "1.3.0", "123:load-1")
+    assert key != AnswerCache.make_key("top 5 fallos", "aero", "1.2.0", "123:load-2")
+
+
+def test_hit_and_ttl_expiry(tmp_path, clock):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"), ttl_s=60)
+    cache.put("k", "q", {"sql": "SELECT 1", "rows": [[1]]})
+    assert cache.get("k") == {"sql": "SELECT 1", "rows": [[1]]}
+    clock[0] += 61
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["entries"]) == (1, 1, 1, 0)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"), max_entries=2)
+    for key in ["a", "b"]:
+        clock[0] += 1
+        cache.put(key, key, {"sql": key})
+    clock[0] += 1
+    cache.get("a")              # 'b' pasa a ser la menos usada
+    clock[0] += 1
+    cache.put("c", "c", {"sql": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("langchain_openai", reason="requiere las dependencias de src/sql_agent/requirements.txt")
+
+from app.api.catalog import COLUMNS_SQL, FINGERPRINT_SQL, SCHEMAS_SQL, SchemaCatalog  # noqa: E402
+
+
+class FakeEngine:
+    """Responde a las tres consultas del catálogo y cuenta cuántas veces se ejecuta cada una."""
+
+    def __init__(self):
+        self.fingerprint = [("aircraft_data", "findings_raw", 16384, 3, "load:1")]
+        self.columns = [("aircraft_data", "findings_raw", "task_id", "text", "YES"),
+                        ("aircraft_data", "findings_raw", "issue_date", "date", "NO")]
+        self.calls = {"fingerprint": 0, "schemas": 0, "columns": 0}
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    def execute(self, sql, params=None):
+        if sql is FINGERPRINT_SQL:
+            self.calls["fingerprint"] += 1
+            return list(self.fingerprint)
+        if sql is SCHEMAS_SQL:
+            self.calls["schemas"] += 1
+            return [(s,) for s in sorted({r[0] for r in self.fingerprint})]
+        self.calls["columns"] += 1
+        assert sql is COLUMNS_SQL
+        return list(self.columns)
+
+
+def test_served_from_memory_until_fingerprint_changes():
+    engine = FakeEngine()
+    catalog = SchemaCatalog(engine, refresh_s=0)
+    assert catalog.tables() == ["aircraft_data.findings_raw"]
+    assert [c["name"] for c in catalog.columns('"aircraft_data"."FINDINGS_RAW"')] == ["task_id", "issue_date"]
+    catalog.schemas()
+    assert catalog.loads == 1 and engine.calls["columns"] == 1
+
+    # recarga con scripts/load_data.py: nuevo sello y una columna más
+    engine.fingerprint = [("aircraft_data", "findings_raw", 16384, 4, "load:2")]
+    engine.columns.append(("aircraft_data", "findings_raw", "ata_chapter_code", "text", "YES"))
+    assert len(catalog.columns("aircraft_data.findings_raw")) == 3
+    assert catalog.loads == 2 and engine.calls["columns"] == 2
+
+
+def test_fingerprint_checked_at_most_every_refresh_s():
+    engine = FakeEngine()
+    catalog = SchemaCatalog(engine, refresh_s=3600)
+    for _ in range(5):
+        catalog.tables()
+    assert engine.calls == {"fingerprint": 1, "schemas": 1, "columns": 1}
+
+
+def test_unknown_table_and_compact_prompt():
+    catalog = SchemaCatalog(FakeEngine(), refresh_s=0)
+    with pytest.raises(KeyError):
+        catalog.columns("aircraft_data.missing")
+    assert catalog.compact() == '- aircraft_data.findings_raw: "task_id" text, "issue_date" date'
+    assert "tablas más" in catalog.compact(max_chars=10)
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("langchain_openai", reason="requiere las dependencias de src/sql_agent/requirements.txt")
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from app.api.tools import fetch_bounded  # noqa: E402
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE findings (id INTEGER, ata TEXT)"))
+        conn.execute(text("INSERT INTO findings VALUES (:id, :ata)"),
+                     [{"id": i, "ata": f"{20 + i % 3}"} for i in range(10)])
+    return engine
+
+
+def test_truncates_at_max_rows(engine):
+    out = fetch_bounded(engine, "SELECT id, ata FROM findings ORDER BY id", max_rows=4)
+    assert out == {"columns": ["id", "ata"], "rows": [[0, "20"], [1, "21"], [2, "22"], [3, "20"]],
+                   "row_count": 4, "truncated": True}
+
+
+def test_not_truncated_when_everything_fits(engine):
+    out = fetch_bounded(engine, "SELECT id FROM findings WHERE ata = :ata ORDER BY id", {"ata": "21"}, max_rows=3)
+    assert out["rows"] == [[1], [4], [7]]
+    assert out["row_count"] == 3 and not out["truncated"]
+
+
+def test_empty_result_keeps_columns(engine):
+    out = fetch_bounded(engine, "SELECT id, ata FROM findings WHERE id < 0")
+    assert out == {"columns": ["id", "ata"], "rows": [], "row_count": 0, "truncated": False}
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain_openai", reason="requiere las dependencias de src/sql_agent/requirements.txt")
+
+from app.api.cache import ResultCache, normalize_sql, referenced_tables  # noqa: E402
+
+
+def test_normalize_sql_keeps_literals():
+    sql = "SELECT  a,\n  b FROM t WHERE x = 'dos  espacios' ;"
+    assert normalize_sql(sql) == "SELECT a, b FROM t WHERE x = 'dos  espacios'"
+    assert normalize_sql("select 1") == normalize_sql("  select   1;")
+
+
+def test_referenced_tables_ignores_literals():
+    sql = """SELECT * FROM aircraft_data.findings_raw f
+             JOIN "Fleet"."Aircraft" a ON a.id = f.ac_id
+             WHERE f.text LIKE '%from hangar join%'"""
+    assert referenced_tables(sql) == ['"Fleet"."Aircraft"', "aircraft_data.findings_raw"]
+
+
+def test_referenced_tables_with_cte():
+    sql = """WITH recent AS (SELECT * FROM aircraft_data.findings_raw WHERE issue_date > now() - interval '90 days')
+             SELECT count(*) FROM recent"""
+    # el nombre de la CTE aparece, pero no existe como tabla: su versión es "" y no cambia
+    assert referenced_tables(sql) == ["aircraft_data.findings_raw", "recent"]
+
+
+def test_concurrent_identical_queries_execute_once():
+    cache = ResultCache()
+    calls = []
+    release = threading.Event()
+
+    def execute():
+        calls.append(1)
+        release.wait(5)
+        return {"rows": [[1]]}
+
+    key = ResultCache.make_key("SELECT 1", {})
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_execute(key, execute))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    while cache.stats()["coalesced"] < 7:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and results == [{"rows": [[1]]}] * 8
+    assert cache.get_or_execute(key, execute) == {"rows": [[1]]} and len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = ResultCache()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_execute("k", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for t in threads:
+        t.start()
+    while cache.stats()["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+    assert errors == ["boom"] * 4
+    assert cache.get_or_execute("k", lambda: {"rows": []}) == {"rows": []}
+    assert cache.stats()["errors"] == 1
+
+
+def test_key_changes_with_table_version():
+    assert ResultCache.make_key("SELECT 1", {"t": "1:a"}) != ResultCache.make_key("SELECT 1", {"t": "1:b"})
+
+
+def test_large_results_are_not_stored():
+    cache = ResultCache(max_rows=2)
+    cache.get_or_execute("k", lambda: {"rows": [[1], [2], [3]]})
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,38 @@
+import pytest
+
+# app/api/__init__.py importa el agente (LangChain); sin sus dependencias no se puede importar app.api
+pytest.importorskip("langchain_openai", reason="requiere las dependencias de src/sql_agent/requirements.txt")
+
+from app.api.semantic_cache import SemanticCache  # noqa: E402
+
+BASE = "top 5 tipos de fallo últimos 90 días"
+
+
+@pytest.fixture
+def cache():
+    c = SemanticCache()
+    c.add(BASE, "SELECT 1")
+    return c
+
+
+@pytest.mark.parametrize("question", [
+    "5 failure types más frecuentes 90 días",
+    "top 5 failure types last 90 days",
+    "¿Top 5 tipos de fallo en los últimos 90 días?",
+])
+def test_same_question_reworded_hits(cache, question):
+    assert cache.lookup(question)["sql"] == "SELECT 1"
+
+
+@pytest.mark.parametrize("question", [
+    "top 5 tipos de fallo últimos 90 días por modelo",
+    "top 5 tipos de fallo últimos 90 días por matrícula",
+    "top 5 tipos de fallo últimos 90 días en cabina",
+    "top 5 tipos de fallo no últimos 90 días",
+])
+def test_different_content_words_miss(cache, question):
+    assert cache.lookup(question) is None
+
+
+def test_different_literals_miss(cache):
+    assert cache.lookup("top 10 tipos de fallo últimos 90 días") is None
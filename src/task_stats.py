@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+
+from src.filter_index import to_day_numbers
+
+
+def _codes(col: pd.Series) -> tuple[np.ndarray, int, pd.Index]:
+    """Códigos enteros compactos de una columna (los nulos cuentan como un valor más)."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        codes = col.cat.codes.to_numpy().astype(np.int64) + 1   # 0 = nulo
+        values = pd.Index([np.nan]).append(pd.Index(col.cat.categories, dtype=object))
+        return codes, len(values), values
+    codes, uniques = pd.factorize(col, use_na_sentinel=False)
+    return codes.astype(np.int64), max(len(uniques), 1), pd.Index(uniques, dtype=object)
+
+
+def _day_codes(dates: pd.Series) -> tuple[np.ndarray, int]:
+    """Días (sin hora) como códigos compactos; NaT es un día más."""
+    uniq, codes = np.unique(to_day_numbers(dates), return_inverse=True)
+    return codes.astype(np.int64).ravel(), max(len(uniq), 1)
+
+
+def _combine(parts: list) -> tuple[np.ndarray, int]:
+    """Combina varios (códigos, cardinalidad) en una clave int64 (base mixta)."""
+    radix = 1
+    for _, n in parts:
+        radix *= n
+    if radix < 2**62:
+        key = np.zeros(len(parts[0][0]), dtype=np.int64)
+        for codes, n in parts:
+            key = key * n + codes
+        return key, radix
+    # demasiadas combinaciones para una base mixta: se compactan por filas únicas
+    uniq, inv = np.unique(np.column_stack([c for c, _ in parts]), axis=0, return_inverse=True)
+    return inv.astype(np.int64).ravel(), len(uniq)
+
+
+def _distinct_per_group(group_codes: np.ndarray, n_groups: int, key: np.ndarray) -> np.ndarray:
+    """Nº de claves distintas por grupo ('key' debe incluir el grupo): sort/unique sobre enteros."""
+    _, first = np.unique(key, return_index=True)
+    return np.bincount(group_codes[first], minlength=n_groups)
+
+
+def _finding_codes(df: pd.DataFrame) -> tuple[np.ndarray, int]:
+    # Si el set no trae finding_id, cada fila (índice) es un finding distinto
+    ids = df["finding_id"] if "finding_id" in df.columns else df.index.to_series()
+    codes, n, _ = _codes(ids)
+    return codes, n
+
+
+def execution_ids(df: pd.DataFrame) -> np.ndarray:
+    """
+    Ejecución (E) = task_id + ac_registration_id + día de issue_date, como clave int64
+    a partir de códigos enteros (sin construir strings por fila).
+    """
+    task, n_task, _ = _codes(df["task_id"])
+    reg, n_reg, _ = _codes(df["ac_registration_id"])
+    key, _ = _combine([(task, n_task), (reg, n_reg), _day_codes(df["Date"])])
+    return key
+
+
+def task_ratio_stats(df: pd.DataFrame) -> pd.DataFrame:
+    """Por task_id: findings distintos (F) y ejecuciones distintas (E)."""
+    task, n_task, task_values = _codes(df["task_id"])
+    reg, n_reg, _ = _codes(df["ac_registration_id"])
+    exec_key, _ = _combine([(task, n_task), (reg, n_reg), _day_codes(df["Date"])])
+    find_key, _ = _combine([(task, n_task), _finding_codes(df)])
+
+    out = pd.DataFrame({
+        "task_id": task_values,
+        "F": _distinct_per_group(task, n_task, find_key),
+        "E": _distinct_per_group(task, n_task, exec_key),
+    })
+    if isinstance(df["task_id"].dtype, pd.CategoricalDtype):
+        out["task_id"] = pd.Categorical(out["task_id"], categories=df["task_id"].cat.categories)
+    return out[out["F"] > 0].reset_index(drop=True)
+
+
+# -------------------- Estadísticas materializadas por (task, día) --------------------
+# Grano: día x task x matrícula x modelo x descripción. Las dimensiones de aeronave van en el
+# grano para poder aplicar esos filtros sin volver a las filas; el resto de filtros
+# (finding_source, ATA, AMM, location) son por finding y obligan a usar task_ratio_stats.
+STATS_DIMENSIONS = ["task_id", "ac_registration_id", "ac_model", "aircraft_description"]
+
+
+def _categories(col: pd.Series) -> pd.Index:
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.cat.categories
+    return pd.Index(col.dropna().unique())
+
+
+def _codes_in(col: pd.Series, categories: pd.Index) -> np.ndarray:
+    """Códigos respecto a 'categories' (0 = nulo, i + 1 = categories[i])."""
+    if isinstance(col.dtype, pd.CategoricalDtype) and col.cat.categories.equals(categories):
+        return col.cat.codes.to_numpy().astype(np.int64) + 1
+    return categories.get_indexer(col) + 1
+
+
+def _day_fingerprints(df: pd.DataFrame, days: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Hash por día de las columnas que afectan a las estadísticas (suma de hashes de fila)."""
+    cols = STATS_DIMENSIONS + (["finding_id"] if "finding_id" in df.columns else [])
+    row_hash = pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+    uniq, inv = np.unique(days, return_inverse=True)
+    fp = np.zeros(len(uniq), dtype=np.uint64)
+    np.add.at(fp, inv.ravel(), row_hash)   # suma modular en uint64
+    return uniq, fp
+
+
+class TaskDayStats:
+    """
+    Tabla materializada de findings distintos (F) por día, task y aeronave, ordenada por
+    (día, task, matrícula, ...). E se deriva de ella: una ejecución es task + matrícula + día,
+    así que las ejecuciones distintas de cualquier ventana son las filas con (día, task,
+    matrícula) distintos, que quedan contiguas por el orden de la tabla.
+
+    F se suma entre días: cada finding pertenece a un único día de issue_date.
+    """
+
+    def __init__(self, days, codes: dict, F, categories: dict, fingerprints: tuple):
+        # lexsort: la última clave es la principal -> (día, task, matrícula, modelo, descripción)
+        order = np.lexsort(tuple(codes[c] for c in reversed(STATS_DIMENSIONS)) + (days,))
+        self.days = days[order]
+        self.codes = {c: codes[c][order] for c in STATS_DIMENSIONS}
+        self.F = F[order]
+        self.categories = categories
+        self.fingerprints = fingerprints
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @staticmethod
+    def _grain(part: pd.DataFrame, days: np.ndarray, categories: dict) -> tuple:
+        codes = np.column_stack([days] + [_codes_in(part[c], categories[c]) for c in STATS_DIMENSIONS])
+        uniq, inv = np.unique(codes, axis=0, return_inverse=True)
+        inv = inv.ravel()
+        if "finding_id" in part.columns:
+            fid, fid_values = pd.factorize(part["finding_id"], use_na_sentinel=False)
+            _, first = np.unique(inv.astype(np.int64) * (len(fid_values) + 1) + fid, return_index=True)
+            F = np.bincount(inv[first], minlength=len(uniq))
+        else:
+            F = np.bincount(inv, minlength=len(uniq))
+        return uniq[:, 0], {c: uniq[:, i + 1] for i, c in enumerate(STATS_DIMENSIONS)}, F
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "TaskDayStats":
+        categories = {c: _categories(df[c]) for c in STATS_DIMENSIONS}
+        days = to_day_numbers(df["Date"])
+        grain_days, codes, F = cls._grain(df, days, categories)
+        return cls(grain_days, codes, F, categories, _day_fingerprints(df, days))
+
+    def refresh(self, df: pd.DataFrame) -> "TaskDayStats":
+        """
+        Nueva tabla para una versión posterior del dataset recalculando SÓLO los días cuyo
+        contenido cambió (nuevos, borrados o modificados); el resto se reutiliza.
+        """
+        days = to_day_numbers(df["Date"])
+        fp_days, fp = _day_fingerprints(df, days)
+        old = pd.Series(self.fingerprints[1], index=self.fingerprints[0])
+        new = pd.Series(fp, index=fp_days)
+        union = old.index.union(new.index)
+        changed = union[old.reindex(union).ne(new.reindex(union)).to_numpy()].to_numpy()
+
+        categories = {c: _categories(df[c]) for c in STATS_DIMENSIONS}
+        keep = ~np.isin(self.days, changed)
+        codes = {}
+        for c in STATS_DIMENSIONS:
+            remap = np.concatenate([[0], categories[c].get_indexer(self.categories[c]) + 1])
+            codes[c] = remap[self.codes[c][keep]]
+        grain_days, F = self.days[keep], self.F[keep]
+
+        # filas de los días afectados (por búsqueda binaria sobre las fechas ordenadas)
+        order = np.argsort(days, kind="stable")
+        lo = np.searchsorted(days[order], changed, side="left")
+        hi = np.searchsorted(days[order], changed, side="right")
+        rows = order[np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)] + [np.arange(0)])]
+        if len(rows):
+            new_days, new_codes, new_F = self._grain(df.iloc[rows], days[rows], categories)
+            grain_days = np.concatenate([grain_days, new_days])
+            codes = {c: np.concatenate([codes[c], new_codes[c]]) for c in STATS_DIMENSIONS}
+            F = np.concatenate([F, new_F])
+        return TaskDayStats(grain_days, codes, F, categories, (fp_days, fp))
+
+    def supports(self, selections: dict) -> bool:
+        """True si todos los filtros activos son dimensiones de la tabla."""
+        return all(col in STATS_DIMENSIONS for col, vals in selections.items() if vals)
+
+    def task_stats(self, start, end, selections: dict) -> pd.DataFrame:
+        """F y E por task_id para la ventana [start, end] (días incluidos) y los filtros dados."""
+        first, last = to_day_numbers([pd.Timestamp(start), pd.Timestamp(end)])
+        lo, hi = np.searchsorted(self.days, [first, last + 1])
+        day, F = self.days[lo:hi], self.F[lo:hi]
+        codes = {c: self.codes[c][lo:hi] for c in STATS_DIMENSIONS}
+
+        mask = np.ones(len(day), dtype=bool)
+        for col, vals in selections.items():
+            if vals and col in codes:
+                vals = list(vals)
+                wanted = self.categories[col].get_indexer([v for v in vals if not pd.isna(v)]) + 1
+                wanted = wanted[wanted > 0]
+                if any(pd.isna(v) for v in vals):
+                    wanted = np.append(wanted, 0)
+                mask &= np.isin(codes[col], wanted)
+        day, F = day[mask], F[mask]
+        task, reg = codes["task_id"][mask], codes["ac_registration_id"][mask]
+
+        n_task = len(self.categories["task_id"]) + 1
+        new_exec = np.ones(len(day), dtype=bool)
+        new_exec[1:] = (day[1:] != day[:-1]) | (task[1:] != task[:-1]) | (reg[1:] != reg[:-1])
+        out = pd.DataFrame({
+            "task_id": pd.Categorical.from_codes(np.arange(n_task) - 1, self.categories["task_id"]),
+            "F": np.bincount(task, weights=F, minlength=n_task).astype(np.int64),
+            "E": np.bincount(task[new_exec], minlength=n_task),
+        })
+        return out[out["F"] > 0].reset_index(drop=True)
+
+
+# Última tabla materializada (de cualquier versión): base para el refresco incremental
+_LATEST_TASK_DAY_STATS = {}
+
+
+def get_task_day_stats(dataset) -> TaskDayStats:
+    """Tabla (task, día) de la versión actual del dataset, refrescando sólo los días cambiados."""
+    def _build(df: pd.DataFrame) -> TaskDayStats:
+        previous = _LATEST_TASK_DAY_STATS.get("stats")
+        stats = TaskDayStats.build(df) if previous is None else previous.refresh(df)
+        _LATEST_TASK_DAY_STATS["stats"] = stats
+        return stats
+    return dataset.derived("task_day_stats", _build)
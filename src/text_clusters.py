@@ -0,0 +1,295 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.data_load import CACHE_DIR, FindingsDataset
+from src.filter_index import FilterCache
+
+# Texto libre que describe cada finding (se concatena en un único documento)
+TEXT_COLUMNS = ["description_failure", "description_text", "action_text"]
+# Dimensión del espacio de hashing (término -> columna); 2**16 deja centroides densos pequeños
+N_FEATURES = 2**16
+TOKEN_PATTERN = r"[a-z][a-z0-9]+"
+STOP_WORDS = frozenset("""
+a an and are as at be been by for from has have in is it its of on or that the this to was were
+with will not no found iaw per ref see carried out performed nil
+""".split())
+
+# Forma parte del nombre de los ficheros de features: si cambia la configuración se regeneran
+FEATURES_TAG = hashlib.sha1(json.dumps(
+    [TEXT_COLUMNS, N_FEATURES, TOKEN_PATTERN, sorted(STOP_WORDS)]).encode()).hexdigest()[:8]
+
+
+def documents(df: pd.DataFrame) -> pd.Series:
+    """Texto de cada finding: columnas de TEXT_COLUMNS presentes, en minúsculas."""
+    cols = [c for c in TEXT_COLUMNS if c in df.columns]
+    if not cols:
+        return pd.Series("", index=df.index)
+    text = df[cols[0]].astype("string").fillna("")
+    for c in cols[1:]:
+        text = text + " " + df[c].astype("string").fillna("")
+    return text.str.lower()
+
+
+def tokenize(docs: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """(nº de documento, token) de cada token de 'docs' (posiciones 0..n-1), sin stop words."""
+    tokens = docs.reset_index(drop=True).str.findall(TOKEN_PATTERN).explode().dropna()
+    tokens = tokens[~tokens.isin(STOP_WORDS)]
+    return tokens.index.to_numpy(dtype=np.int64), tokens.to_numpy(dtype=object)
+
+
+def hash_tokens(tokens: np.ndarray) -> np.ndarray:
+    """Columna de cada token en el espacio de hashing."""
+    return (pd.util.hash_array(tokens) % np.uint64(N_FEATURES)).astype(np.int64)
+
+
+def tf_matrix(doc_ids: np.ndarray, buckets: np.ndarray, n_docs: int) -> sparse.csr_matrix:
+    """Frecuencias sublineales (1 + log tf) por documento y columna de hashing."""
+    counts = sparse.csr_matrix((np.ones(len(doc_ids), dtype=np.float32), (doc_ids, buckets)),
+                               shape=(n_docs, N_FEATURES))
+    counts.sum_duplicates()
+    counts.data = 1 + np.log(counts.data)
+    return counts
+
+
+def normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """Normaliza cada fila a norma L2 = 1 (las filas vacías quedan a cero)."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix, dtype=np.float32)
+
+
+def vectorize(docs: pd.Series, idf: np.ndarray) -> tuple[sparse.csr_matrix, np.ndarray]:
+    """
+    Vectores TF-IDF de textos nuevos con un idf ya calculado (sin recalcular el vocabulario).
+    Devuelve también la columna de hashing de cada token (p.ej. para medir términos nuevos).
+    """
+    doc_ids, tokens = tokenize(docs.astype("string").fillna("").str.lower())
+    buckets = hash_tokens(tokens)
+    tf = tf_matrix(doc_ids, buckets, len(docs))
+    tf.data *= idf[tf.indices]
+    return normalize_rows(tf), buckets
+
+
+class TextFeatures:
+    """
+    TF-IDF con hashing de los textos de findings. Se guarda una fila por texto distinto
+    ('matrix') y el texto de cada fila del dataset ('doc_of_row'): los textos repetidos
+    (muy habituales) no duplican memoria ni disco.
+    'terms' da el token más frecuente de cada columna de hashing (para mostrar términos).
+    """
+
+    def __init__(self, matrix: sparse.csr_matrix, doc_of_row: np.ndarray, idf: np.ndarray, terms: np.ndarray):
+        self.matrix = matrix
+        self.doc_of_row = doc_of_row
+        self.idf = idf
+        self.terms = terms
+
+    def __len__(self) -> int:
+        return len(self.doc_of_row)
+
+    def rows(self, positions) -> sparse.csr_matrix:
+        """Vectores de las filas del dataset en 'positions'."""
+        return self.matrix[self.doc_of_row[positions]]
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "TextFeatures":
+        doc_of_row, uniques = pd.factorize(documents(df))
+        doc_ids, tokens = tokenize(pd.Series(uniques))
+        buckets = hash_tokens(tokens)
+        tf = tf_matrix(doc_ids, buckets, len(uniques))
+
+        # document frequency por findings (un texto repetido cuenta tantas veces como filas)
+        multiplicity = np.bincount(doc_of_row, minlength=len(uniques))
+        nnz_rows = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+        doc_freq = np.bincount(tf.indices, weights=multiplicity[nnz_rows], minlength=N_FEATURES)
+        idf = (np.log((1 + len(doc_of_row)) / (1 + doc_freq)) + 1).astype(np.float32)
+        tf.data *= idf[tf.indices]
+
+        pairs = pd.DataFrame({"bucket": buckets, "token": tokens})
+        top = pairs.value_counts(sort=True).reset_index().drop_duplicates("bucket")
+        terms = np.full(N_FEATURES, "", dtype=object)
+        terms[top["bucket"].to_numpy()] = top["token"].to_numpy()
+        return cls(normalize_rows(tf), doc_of_row.astype(np.int64), idf, terms.astype(str))
+
+    def save(self, version: str) -> None:
+        matrix_path, meta_path = _features_paths(version)
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Borra features de versiones anteriores
+        for old in CACHE_DIR.glob("text_features.*.npz"):
+            old.unlink(missing_ok=True)
+        for path, write in [(matrix_path, lambda f: sparse.save_npz(f, self.matrix)),
+                            (meta_path, lambda f: np.savez(f, doc_of_row=self.doc_of_row, idf=self.idf, terms=self.terms))]:
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, version: str) -> "TextFeatures":
+        matrix_path, meta_path = _features_paths(version)
+        meta = np.load(meta_path)
+        return cls(sparse.load_npz(matrix_path).tocsr(), meta["doc_of_row"], meta["idf"], meta["terms"])
+
+
+def _features_paths(version: str) -> tuple:
+    stem = f"text_features.{version[:16]}.{FEATURES_TAG}"
+    return CACHE_DIR / f"{stem}.matrix.npz", CACHE_DIR / f"{stem}.meta.npz"
+
+
+def get_text_features(dataset: FindingsDataset) -> TextFeatures:
+    """Features de texto de la versión actual: de disco si existen, si no se calculan y guardan."""
+    def _build(df: pd.DataFrame) -> TextFeatures:
+        if all(p.exists() for p in _features_paths(dataset.version)):
+            try:
+                return TextFeatures.load(dataset.version)
+            except Exception as e:
+                print(f"[WARN] Features de texto ilegibles, se regeneran: {e}")
+        features = TextFeatures.build(df)
+        try:
+            features.save(dataset.version)
+        except OSError as e:
+            print(f"[WARN] No se pudieron guardar las features de texto: {e}")
+        return features
+    return dataset.derived("text_features", _build)
+
+
+class MiniBatchKMeans:
+    """
+    K-means esférico por mini-lotes (similitud coseno sobre vectores L2-normalizados):
+    cada iteración asigna un lote aleatorio y mueve cada centroide hacia la media de su
+    parte del lote con tasa 1 / nº de puntos vistos (Sculley, 2010).
+    """
+
+    def __init__(self, n_clusters: int = 10, batch_size: int = 2048, max_iter: int = 100, seed: int = 0):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.max_iter = max_iter
+        self.seed = seed
+        self.centers = None
+
+    def _init_centers(self, sample: sparse.csr_matrix, rng: np.random.Generator) -> np.ndarray:
+        """k-means++ sobre una muestra (distancia = 1 - coseno)."""
+        centers = [sample[rng.integers(sample.shape[0])].toarray().ravel()]
+        dist = np.ones(sample.shape[0])
+        for _ in range(1, self.n_clusters):
+            sim = sample @ centers[-1]
+            dist = np.minimum(dist, np.clip(1 - sim, 0, None))
+            probs = dist / dist.sum() if dist.sum() > 0 else None
+            centers.append(sample[rng.choice(sample.shape[0], p=probs)].toarray().ravel())
+        return np.vstack(centers).astype(np.float32)
+
+    def fit(self, rows, n_rows: int) -> "MiniBatchKMeans":
+        """'rows(posiciones)' devuelve los vectores de esas filas: sólo se materializa cada lote."""
+        rng = np.random.default_rng(self.seed)
+        self.n_clusters = max(1, min(self.n_clusters, n_rows))
+        batch = min(self.batch_size, n_rows)
+        sample = rows(rng.choice(n_rows, min(n_rows, max(batch, 20 * self.n_clusters)), replace=False))
+        centers = self._init_centers(sample, rng)
+        seen = np.zeros(self.n_clusters)
+        for _ in range(self.max_iter):
+            X = rows(np.sort(rng.choice(n_rows, batch, replace=False)))
+            labels = np.asarray((X @ centers.T).argmax(axis=1)).ravel()
+            members = sparse.csr_matrix((np.ones(batch), (labels, np.arange(batch))), shape=(self.n_clusters, batch))
+            sums = (members @ X).toarray()
+            n = np.bincount(labels, minlength=self.n_clusters)
+            seen += n
+            hit = n > 0
+            eta = (n[hit] / seen[hit])[:, None]
+            centers[hit] = (1 - eta) * centers[hit] + eta * (sums[hit] / n[hit][:, None])
+            norms = np.linalg.norm(centers, axis=1, keepdims=True)
+            centers = centers / np.where(norms == 0, 1, norms)
+        self.centers = centers.astype(np.float32)
+        return self
+
+    def predict(self, X: sparse.csr_matrix, chunk_size: int = 100_000) -> tuple[np.ndarray, np.ndarray]:
+        """(cluster, similitud con su centroide) por fila; filas sin texto -> (-1, 0)."""
+        labels = np.empty(X.shape[0], dtype=np.int64)
+        similarity = np.empty(X.shape[0], dtype=np.float32)
+        for lo in range(0, X.shape[0], chunk_size):
+            sim = np.asarray(X[lo:lo + chunk_size] @ self.centers.T)
+            labels[lo:lo + chunk_size] = sim.argmax(axis=1)
+            similarity[lo:lo + chunk_size] = sim.max(axis=1)
+        empty = np.diff(X.indptr) == 0
+        labels[empty], similarity[empty] = -1, 0
+        return labels, similarity
+
+    def top_terms(self, terms: np.ndarray, n: int = 8) -> list:
+        """Términos de mayor peso de cada centroide."""
+        top = np.argsort(-self.centers, axis=1)[:, :n]
+        return [[terms[j] for j in row if terms[j] and self.centers[i, j] > 0] for i, row in enumerate(top)]
+
+
+class ClusterResult:
+    """Modelo ajustado sobre un conjunto de filas y la asignación de cada una."""
+
+    def __init__(self, model: MiniBatchKMeans, positions: np.ndarray, labels: np.ndarray, similarity: np.ndarray):
+        self.model = model
+        self.positions = positions
+        self.labels = labels
+        self.similarity = similarity
+
+
+# Findings por debajo de esta similitud con su centroide: atípicos del cluster
+OUTLIER_SIMILARITY = 0.2
+
+# Ajustes recientes (por versión, filtros y nº de clusters), compartidos entre sesiones
+CLUSTER_CACHE = FilterCache(maxsize=16)
+
+
+def cluster_findings(features: TextFeatures, positions: np.ndarray, n_clusters: int = 10, seed: int = 0) -> ClusterResult:
+    """Ajusta k-means sobre las filas 'positions' y asigna cada una (una vez por texto distinto)."""
+    positions = np.asarray(positions, dtype=np.int64)
+    docs = features.doc_of_row[positions]
+    has_text = np.diff(features.matrix.indptr)[docs] > 0
+    fit_rows = positions[has_text]
+    model = MiniBatchKMeans(n_clusters=n_clusters, seed=seed)
+    if len(fit_rows) == 0:
+        return ClusterResult(model, positions, np.full(len(positions), -1), np.zeros(len(positions), dtype=np.float32))
+    model.fit(lambda idx: features.rows(fit_rows[idx]), len(fit_rows))
+
+    uniq, inverse = np.unique(docs, return_inverse=True)
+    labels, similarity = model.predict(features.matrix[uniq])
+    return ClusterResult(model, positions, labels[inverse.ravel()], similarity[inverse.ravel()])
+
+
+def _top_values(frame: pd.DataFrame, column: str, n: int = 3) -> pd.Series:
+    """Por cluster, los n valores más frecuentes de 'column' como 'valor (nº), ...'."""
+    top = (frame.groupby(["cluster", column]).size().rename("n").reset_index()
+                .sort_values(["cluster", "n"], ascending=[True, False], kind="stable")
+                .groupby("cluster").head(n))
+    top["label"] = top[column] + " (" + top["n"].map("{:,}".format) + ")"
+    return top.groupby("cluster")["label"].agg(", ".join)
+
+
+def cluster_summary(result: ClusterResult, terms: np.ndarray, ata_names: pd.Series,
+                    tails: pd.Series = None) -> pd.DataFrame:
+    """
+    Resumen por cluster: tamaño, términos principales, capítulos ATA y aviones (matrícula)
+    más frecuentes, cohesión (similitud media) y atípicos (similitud < OUTLIER_SIMILARITY).
+    'ata_names' / 'tails': capítulo ATA y ac_registration_id de cada fila de result.positions.
+    """
+    top_terms = result.model.top_terms(terms) if result.model.centers is not None else []
+    labels = pd.Series(result.labels)
+    frame = pd.DataFrame({"cluster": labels, "similarity": result.similarity,
+                          "ata": pd.Series(ata_names).astype("string").fillna("no data").to_numpy()})
+    if tails is not None:
+        frame["tail"] = pd.Series(tails).astype("string").fillna("no data").to_numpy()
+    grouped = frame.groupby("cluster")
+
+    out = pd.DataFrame({
+        "Findings": grouped.size(),
+        "Cohesion": grouped["similarity"].mean().round(3),
+        "Outliers": (frame["similarity"] < OUTLIER_SIMILARITY).groupby(frame["cluster"]).sum(),
+    })
+    out["% of Findings"] = (100 * out["Findings"] / max(len(frame), 1)).round(2)
+    out["Top terms"] = [", ".join(top_terms[c]) if 0 <= c < len(top_terms) else "(no text)" for c in out.index]
+    out["Top ATA chapters"] = _top_values(frame, "ata").reindex(out.index).fillna("")
+    if tails is not None:
+        out["Aircraft"] = pd.Series(tails).astype("string").groupby(labels.to_numpy()).nunique()
+        out["Top tails"] = _top_values(frame, "tail").reindex(out.index).fillna("")
+    return out.sort_values("Findings", ascending=False)
@@ -1,6 +1,14 @@
+import math
+
 import streamlit as st
 from datetime import date, timedelta
 import pandas as pd
+import numpy as np
+
+from src.data_load import FindingsDataset
+from src.filter_index import cached_filter_rows, filter_key
+from src.facets import facet_counts
+from src.paged_table import table_page
 
 def set_base_session_sates():
     # Fechas por defecto (últimos 365 días)
@@ -18,41 +26,134 @@ def set_base_session_sates():
     return
 
 
-def filter_data(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-
-    # Asegurar tipo datetime
-    if "Date" in df.columns:
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-
-        # Normalizar rango (independiente del orden seleccionado)
-        start = pd.to_datetime(min(st.session_state.end_date, st.session_state.ini_date))
-        end   = pd.to_datetime(max(st.session_state.end_date, st.session_state.ini_date))
-
-        df = df[(df["Date"] >= start) & (df["Date"] <= end)]
-
-    # Helper para aplicar filtros de forma segura
-    def _safe_filter(_df, col_name, state_key):
-        vals = st.session_state.get(state_key, [])
-        if vals and col_name in _df.columns:
-            return _df[_df[col_name].isin(vals)]
-        return _df
-
-    df = _safe_filter(df, "ac_model", "ac_model")
-    df = _safe_filter(df, "aircraft_description", "ac_description")
-    df = _safe_filter(df, "ac_registration_id", "reg_number")
-    df = _safe_filter(df, "finding_source", "finding_source")
-    df = _safe_filter(df, "ata_chapter_code", "ata")
-    df = _safe_filter(df, "task_id", "taskcard")
-    df = _safe_filter(df, "amm_reference", "amm_code")
-    loc_vals = st.session_state.get("location", [])
-    if loc_vals:
-        if "location" in df.columns:
-            df = df[df["location"].isin(loc_vals)]
-        elif "defect_location" in df.columns:
-            df = df[df["defect_location"].isin(loc_vals)]
-
-    return df
+# Filtros multiselect: (columna del dataset, clave en session_state)
+FILTER_COLUMNS = [
+    ("ac_model", "ac_model"),
+    ("aircraft_description", "ac_description"),
+    ("ac_registration_id", "reg_number"),
+    ("finding_source", "finding_source"),
+    ("ata_chapter_code", "ata"),
+    ("task_id", "taskcard"),
+    ("amm_reference", "amm_code"),
+]
+
+
+def current_window() -> tuple:
+    """(inicio, fin) de session_state, normalizado (independiente del orden seleccionado)."""
+    start = min(st.session_state.end_date, st.session_state.ini_date)
+    end   = max(st.session_state.end_date, st.session_state.ini_date)
+    return start, end
+
+
+def current_selections(columns) -> dict:
+    """{columna: valores seleccionados} según session_state."""
+    selections = {col: list(st.session_state.get(key, [])) for col, key in FILTER_COLUMNS}
+    loc_col = "location" if "location" in columns else "defect_location"
+    selections[loc_col] = list(st.session_state.get("location", []))
+    return selections
+
+
+def facet_multiselects(dataset: FindingsDataset, specs) -> None:
+    """
+    Pinta los multiselect de filtros con opciones facetadas: sólo valores que devuelven
+    filas con el resto de filtros y la ventana actual, con su número de findings.
+    specs: lista de (contenedor, etiqueta, columna, clave en session_state).
+    """
+    # Los widgets guardan su valor en 'facet_<clave>' antes del rerun: se sincroniza primero
+    # para que todas las facetas se calculen con la selección más reciente
+    for _, _, _, state_key in specs:
+        if f"facet_{state_key}" in st.session_state:
+            st.session_state[state_key] = st.session_state[f"facet_{state_key}"]
+
+    selections = current_selections(dataset.columns)
+    start, end = current_window()
+
+    for container, label, col, state_key in specs:
+        counts = facet_counts(dataset, col, selections, start, end)
+        selected = list(st.session_state.get(state_key, []))
+        # lo ya seleccionado se mantiene aunque ahora no tenga filas
+        options = list(counts.index) + [v for v in selected if v not in counts.index]
+        labels = counts.to_dict()
+        with container:
+            st.session_state[state_key] = st.multiselect(
+                label,
+                options=options,
+                default=selected,
+                format_func=lambda v, _labels=labels: f"{v} ({_labels.get(v, 0):,})",
+                key=f"facet_{state_key}",
+            )
+
+
+def filtered_rows(dataset: FindingsDataset) -> slice | np.ndarray:
+    """Posiciones de fila que cumplen los filtros y la ventana de session_state."""
+    start, end = current_window()
+
+    # Ventana por búsqueda binaria sobre el dataset ordenado por fecha + intersección
+    # de posting lists del índice invertido.
+    # El resultado (posiciones) se reutiliza entre páginas y sesiones con la misma selección.
+    return cached_filter_rows(dataset, current_selections(dataset.columns), start, end)
+
+
+def filter_data(dataset: FindingsDataset) -> pd.DataFrame:
+    # Una única selección de filas al final
+    return dataset.take(filtered_rows(dataset))
+
+
+def current_filter_key(dataset: FindingsDataset) -> tuple:
+    """Clave canónica de la selección actual (identifica el resultado de filter_data)."""
+    start, end = current_window()
+    return filter_key(dataset, current_selections(dataset.columns), start, end)
+
+
+def _reset_page(page_key: str) -> None:
+    st.session_state[page_key] = 1
+
+
+def paged_dataframe(df: pd.DataFrame, key: str, columns=None, labels=None, column_config=None,
+                    sort_by=None, descending=False, cache_key=None, page_sizes=(25, 50, 100, 250)) -> None:
+    """
+    Tabla paginada en el servidor: orden y proyección de columnas se resuelven aquí y
+    al navegador sólo se envía la página visible (no el DataFrame completo).
+    labels: {columna: nombre a mostrar}; cache_key: identifica el contenido de 'df'
+    para reutilizar el orden (p.ej. current_filter_key).
+    """
+    columns = [c for c in (columns if columns is not None else df.columns) if c in df.columns]
+    labels = {c: (labels or {}).get(c, c) for c in columns}
+    page_key = f"{key}_page"
+
+    c1, c2, c3, c4 = st.columns([4, 2, 1, 1])
+    with c1:
+        visible = st.multiselect("Columns", options=columns, default=columns,
+                                 format_func=labels.get, key=f"{key}_columns")
+    with c2:
+        sort_options = [None] + columns
+        sort_col = st.selectbox("Sort by", options=sort_options,
+                                index=sort_options.index(sort_by) if sort_by in columns else 0,
+                                format_func=lambda c: "(none)" if c is None else labels[c],
+                                key=f"{key}_sort", on_change=_reset_page, args=(page_key,))
+    with c3:
+        order = st.selectbox("Order", ["Ascending", "Descending"], index=int(descending),
+                             key=f"{key}_order", on_change=_reset_page, args=(page_key,))
+    with c4:
+        page_size = st.selectbox("Rows per page", page_sizes, index=min(1, len(page_sizes) - 1),
+                                 key=f"{key}_size", on_change=_reset_page, args=(page_key,))
+
+    # Si la selección cambió y hay menos páginas, se vuelve a la última
+    n_pages = max(1, math.ceil(len(df) / page_size))
+    st.session_state[page_key] = min(max(int(st.session_state.get(page_key, 1)), 1), n_pages)
+    page = st.session_state[page_key]
+
+    page_df = table_page(df, visible or columns, sort_col, order == "Ascending",
+                         page - 1, page_size, cache_key=cache_key)
+    st.dataframe(page_df.rename(columns=labels), use_container_width=True, hide_index=True,
+                 column_config=column_config)
+
+    p1, p2 = st.columns([1, 5], vertical_alignment="center")
+    with p1:
+        st.number_input("Page", min_value=1, max_value=n_pages, step=1, key=page_key)
+    with p2:
+        first = (page - 1) * page_size + 1 if len(df) else 0
+        st.caption(f"Rows {first:,}–{min(page * page_size, len(df)):,} of {len(df):,} · page {page} of {n_pages}")
 
 
 def change_verbose_to_code(value: str) -> str:
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Raíz del repo en el path (como scripts/): 'src' se importa como paquete
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,44 @@
+import re
+
+import pandas as pd
+import pytest
+
+from src.ata_index import get_ata_index
+
+
+def baseline_chapter_key(val: object, keys_available: set) -> str | None:
+    """extract_ata_chapter_key de pages/0_Home.py antes del índice ATA (referencia)."""
+    if val is None or (isinstance(val, float) and pd.isna(val)):
+        return None
+    m = re.match(r"^\D*(\d{2,3})", str(val).strip())
+    if not m:
+        return None
+    raw = m.group(1)
+    cands = ([raw[:3].zfill(3)] if len(raw) >= 3 else []) + [raw[:2].zfill(2)]
+    return next((c for c in cands if c in keys_available), None)
+
+
+CODES = ["10-00", "11-52", "5-10", "5-1", "1_0", "7 1", "1-2-3", "27-50-00", "27", "071", "115-20",
+         "05-10", "ZL_05", "ATA 32-11", "2750", "1152", "100", "", "abc", None]
+
+
+@pytest.fixture(scope="module")
+def index():
+    idx = get_ata_index()
+    if len(idx) == 0:
+        pytest.skip("src/utils/ata.json no disponible")
+    return idx
+
+
+def test_chapter_matches_baseline(index):
+    ata_map = index.chapter_map()
+    expected = [ata_map.get(baseline_chapter_key(c, set(ata_map)), "no data") for c in CODES]
+    assert index.chapter_names(pd.Series(CODES, dtype=object)).astype(str).tolist() == expected
+
+
+def test_sections_come_from_following_groups(index):
+    out = index.lookup_codes(["11-52", "10-00", "27-50-00", "2750", "115-20", "5-10"])
+    out = out.astype(object).where(out.notna(), None)
+    assert out["ata_chapter"].tolist() == ["11", "10", "27", "27", "115", None]
+    assert out["ata_section"].tolist() == ["11-52", "10-00", "27-50", "27-50", "115-20", None]
+    assert out["ata_subject"].tolist()[:3] == [None, None, "27-50-00"]
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from src.data_load import FindingsDataset
+from src.filter_index import FILTER_CACHE, FilterCache, cached_filter_rows, filter_key
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = FilterCache(maxsize=100, max_bytes=10 * 8000)
+    for i in range(50):
+        cache.get_or_compute(i, lambda: np.arange(1000, dtype=np.int64))
+        assert cache.nbytes <= cache.max_bytes
+    stats = cache.stats()
+    assert stats["entries"] == 10 and stats["nbytes"] == 10 * 8000
+    # una entrada mayor que todo el presupuesto no se guarda ni vacía la caché
+    cache.get_or_compute("big", lambda: np.zeros(20_000, dtype=np.int64))
+    assert cache.stats()["entries"] == 10
+
+
+def test_slices_and_near_full_selections_are_not_cached():
+    df = pd.DataFrame({"Date": pd.date_range("2024-01-01", periods=1000, freq="h"),
+                       "ac_model": pd.Categorical(["A320"] * 900 + ["A330"] * 100)})
+    dataset = FindingsDataset(df, "filter-cache-test")
+    start, end = pd.Timestamp("2024-01-01"), pd.Timestamp("2024-12-31")
+    cases = [({}, 1000, False), ({"ac_model": ["A320"]}, 900, False), ({"ac_model": ["A330"]}, 100, True)]
+    for selections, n_rows, cached in cases:
+        rows = cached_filter_rows(dataset, selections, start, end)
+        assert len(dataset.take(rows)) == n_rows
+        assert (filter_key(dataset, selections, start, end) in FILTER_CACHE._entries) == cached
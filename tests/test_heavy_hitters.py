@@ -0,0 +1,29 @@
+import numpy as np
+
+from src.heavy_hitters import SpaceSaving
+
+
+def test_space_saving_memory_stays_bounded():
+    rng = np.random.default_rng(0)
+    summary = SpaceSaving(capacity=100)
+    for _ in range(2000):
+        # pocos valores frecuentes que se actualizan en cada lote, sin desalojos
+        summary.update(list(rng.integers(0, 50, size=200)))
+        assert len(summary._heap) <= 2 * summary.capacity
+    assert len(summary.counters) == 50
+    assert summary.total == 2000 * 200
+
+
+def test_space_saving_bounds_hold_with_evictions():
+    rng = np.random.default_rng(1)
+    items = rng.zipf(1.3, size=200_000) % 5000
+    summary = SpaceSaving(capacity=200)
+    for lo in range(0, len(items), 1000):
+        summary.update(list(items[lo:lo + 1000]))
+    assert len(summary._heap) <= 2 * summary.capacity
+    true = np.bincount(items, minlength=5000)
+    top = summary.top(20)
+    est, err = top["count"].to_numpy(), top["error"].to_numpy()
+    real = true[top.index.to_numpy(dtype=np.int64)]
+    assert (est >= real).all() and (est - err <= real).all()
+    assert set(top.index[:5]) == set(np.argsort(-true)[:5])
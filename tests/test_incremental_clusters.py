@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import incremental_clusters
+from src.incremental_clusters import IncrementalClusters, model_path
+from src.text_clusters import TextFeatures
+
+WORDS = ["hydraulic", "leak", "door", "actuator", "corrosion", "rivet", "panel", "fuel", "tank", "seal"]
+
+
+def findings(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    text = [" ".join(rng.choice(WORDS, size=5)) for _ in range(n)]
+    return pd.DataFrame({"work_order_id": np.arange(n).astype(str), "task_id": "T-1",
+                         "ac_registration_id": "EI-AAA", "issue_date": "2025-01-01",
+                         "description_failure": text, "description_text": text, "action_text": ""})
+
+
+def test_lookup_rejects_rows_not_seen_by_update():
+    df = findings(300)
+    state = IncrementalClusters.fit(df.iloc[:200], TextFeatures.build(df.iloc[:200]), n_clusters=3)
+    labels, _ = state.lookup(df.iloc[:200])
+    assert len(labels) == 200
+    with pytest.raises(KeyError):
+        state.lookup(df.iloc[150:250])
+    state.update(df)
+    labels, similarity = state.lookup(df.iloc[150:250])
+    assert (labels >= 0).all() and len(similarity) == 100
+
+
+def test_models_are_saved_per_number_of_clusters(tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental_clusters, "MODEL_DIR", tmp_path)
+    df = findings(200)
+    for k in (3, 5):
+        IncrementalClusters.fit(df, TextFeatures.build(df), n_clusters=k).save(model_path(k))
+    assert model_path(3) != model_path(5)
+    assert IncrementalClusters.load(model_path(3)).n_clusters == 3
+    assert IncrementalClusters.load(model_path(5)).n_clusters == 5
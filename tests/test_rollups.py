@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_load import FindingsDataset
+from src.filter_index import filter_rows
+from src.rollups import ROLLUP_MAX_CARDINALITY, rollup_series
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    rng = np.random.default_rng(0)
+    n = 5000
+    df = pd.DataFrame({
+        "Date": np.sort(pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 400, n), unit="D")),
+        "ac_model": rng.choice(["A320", "A321", "A330"], n),
+        "task_id": [f"T-{i}" for i in rng.integers(0, 3 * ROLLUP_MAX_CARDINALITY, n)],
+    }).astype({"ac_model": "category", "task_id": "category"})
+    return FindingsDataset(df, "test")
+
+
+@pytest.mark.parametrize("selections", [
+    {},
+    {"ac_model": ["A320"]},
+    {"task_id": ["T-1", "T-7"]},                            # columna de muchos valores: filas filtradas
+    {"ac_model": ["A321", "A330"], "task_id": ["T-3"]},
+])
+@pytest.mark.parametrize("freq", ["D", "W", "M"])
+def test_series_matches_filtered_rows(dataset, selections, freq):
+    start, end = pd.Timestamp("2024-02-01"), pd.Timestamp("2024-11-30")
+    series = rollup_series(dataset, selections, start, end, freq)
+    rows = dataset.take(filter_rows(dataset, selections, start, end))
+    expected = rows.groupby(rows["Date"].dt.to_period(freq).dt.start_time).size()
+    assert series.to_numpy().tolist() == expected.to_numpy().tolist()
+    assert (series.index == expected.index).all()
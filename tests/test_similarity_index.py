@@ -0,0 +1,28 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from src import similarity_index
+
+AGENT_READER = Path(__file__).resolve().parents[1] / "src" / "sql_agent" / "app" / "api" / "similar_findings.py"
+
+
+@pytest.fixture(scope="module")
+def reader():
+    # Módulo suelto (sin importar app.api, que arrastra el agente)
+    spec = importlib.util.spec_from_file_location("similar_findings", AGENT_READER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_agent_reader_matches_index_format(reader):
+    assert reader.INDEX_FORMAT == similarity_index.INDEX_FORMAT
+    assert reader.FINGERPRINT_TOKENS == similarity_index.FINGERPRINT_TOKENS
+
+
+@pytest.mark.parametrize("n_tables, n_bits, seed", [(16, 8, 0), (16, 13, 0), (4, 24, 7)])
+def test_agent_reader_hashes_like_the_dashboard(reader, n_tables, n_bits, seed):
+    expected = similarity_index.fingerprint(n_tables, n_bits, seed)
+    assert reader._fingerprint(similarity_index.N_FEATURES, n_tables, n_bits, seed) == expected